@@ -5,8 +5,34 @@ __changelog__ -- contains the project changelog in object form.
 from bwversion import Version, WIPVersion, PlannedVersion, ChangeLog
 
 CHANGELOG = ChangeLog(
-    #WIPVersion('0.3.8',
-    #    ),
+    WIPVersion('0.3.8',
+        'Added ttl, clock and LRU CacheRegistry support to cached decorators',
+        'Added memomethod for argument-keyed memoization with LRU bounds',
+        'Cached decorators now share slotted descriptor classes',
+        'Added __slots__ support to cached values via hidden slots',
+        'Added stale-while-revalidate background refresh to cached values',
+        'Added cache statistics, size accounting and bulk clear to CacheRegistry',
+        'Added persist option to cached and classcached for disk-backed values',
+        'Added tracked_cached for values invalidated by writes to their inputs',
+        'Super method wrappers now resolve base implementations once per class',
+        "Super method wrappers now take the wrapped method's named arguments",
+        'Stacked super method wrappers are flattened into one function per class',
+        'bwmethod.instrument names generated wrappers per layer and can count and time their calls',
+        'before/after/follow_super run generator (coroutine) methods in order, delegating sends and throws',
+        'Added memoize_super, caching base results per instance or per class with LRU, key and ttl',
+        'Added bwmethod.invoke_all to call a method over many objects, grouped by class and optionally in a pool',
+        'BWContext lookups of inherited keys use a per-snapshot index of the base contexts',
+        'BWContext partial keys are held in a segment trie and resolve to the longest matching prefix',
+        'Context references reuse the references made by attribute access on them and intern their paths',
+        'Added BWHamt storage for contexts, selectable with _storage_type, making snapshots constant time',
+        'Added BWContext.update and install_many to set many keys in one pass',
+        'BWThrowable classes can set use_stack to catch through a per-thread frame index',
+        'BWContext remembers keys missing from its bases so repeated misses skip the getter walk',
+        'Added BWContext.get_many and extract to look up many keys in one walk of the getters',
+        'Context properties can cache their results per context and subpath',
+        'Added BWContext.lazy values and BWContext.aget background lookups',
+        'Added BWContext.watch and unwatch for change notifications on keys and prefixes',
+        ),
     Version('0.3.7',
         'Added more flavours of Version (WIPVersion, PlannedVersion)',
         'Fixed bug preventing Version subclasses from working',
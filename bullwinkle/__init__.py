@@ -17,8 +17,10 @@ In addition, bullwinkle provides:
 from __version__ import *
 from bwobject import BWObject
 from bwmethod import (before_super, after_super, follow_super, filter_super,
-                      override_super, around_super, override_result)
-from bwcached import cached, classcached, cachedmethod
+                      override_super, around_super, memoize_super,
+                      override_result)
+from bwcached import (cached, classcached, cachedmethod, memomethod,
+                     tracked_cached, CacheRegistry)
 from bwmember import member, into
 from bwcontext import BWContext
 from bwcoder import BWCodeBlock
@@ -73,10 +73,273 @@ __doc__, etc).  For @cached, simply access it through the class:
 
 >>> DictLookup.value.__doc__
 'Get the value, cache if it exists'
+
+=========================
+=== __slots__ classes ===
+=========================
+
+Classes without an instance __dict__ keep cached values in a hidden slot
+named by slotname().  Classes created by BWObjectMeta that declare
+__slots__ (and get no __dict__ from their bases) get that slot added
+automatically, and the cached value can still be replaced or deleted:
+
+>>> from bwobject import BWObjectMeta
+>>> class Vector(object):
+...     __metaclass__ = BWObjectMeta
+...     __slots__ = ('x', 'y')
+...
+...     def __init__(self, x, y):
+...         self.x, self.y = x, y
+...
+...     @cached
+...     def length(self):
+...         print "Computing length"
+...         return (self.x ** 2 + self.y ** 2) ** .5
+...
+>>> Vector.__slots__
+('x', 'y', '_cached_length')
+>>> v = Vector(3, 4)
+>>> v.length
+Computing length
+5.0
+>>> v.length
+5.0
+>>> del v.length
+>>> v.x = 6; v.y = 8
+>>> v.length
+Computing length
+10.0
+>>> hasattr(v, '__dict__')
+False
+
+Other classes need to list the slot themselves:
+
+>>> class Point(object):
+...     __slots__ = ('x', 'y', slotname('norm'))
+...
+...     def __init__(self, x, y):
+...         self.x, self.y = x, y
+...
+...     @cached
+...     def norm(self):
+...         return abs(self.x) + abs(self.y)
+...
+>>> p = Point(1, -2)
+>>> p.norm = 5
+>>> p.norm
+5
+>>> del p.norm
+>>> p.norm
+3
+>>> class BadPoint(object):
+...     __slots__ = ('x', 'y')
+...
+...     @cached
+...     def norm(self):
+...         return abs(self.x) + abs(self.y)
+...
+>>> BadPoint().norm
+Traceback (most recent call last):
+    ...
+TypeError: 'BadPoint' needs a '_cached_norm' slot to cache 'norm'
+
+========================
+=== Expiring results ===
+========================
+
+Each of the decorators accepts a ttl (in seconds) after which the stored
+result is discarded and recomputed on the next access.  The clock used to
+measure time defaults to time.time but may be replaced (which is mostly
+useful for testing):
+
+>>> now = [0]
+>>> class Config(object):
+...     @cached(ttl=10, clock=lambda: now[0])
+...     def settings(self):
+...         print "Loading settings"
+...         return {'timeout': 5}
+...
+>>> c = Config()
+>>> c.settings
+Loading settings
+{'timeout': 5}
+>>> now[0] = 9
+>>> c.settings
+{'timeout': 5}
+>>> now[0] = 10
+>>> c.settings
+Loading settings
+{'timeout': 5}
+
+Expiring results can still be dropped with del or replaced by assignment
+(which restarts the ttl):
+
+>>> del c.settings
+>>> c.settings
+Loading settings
+{'timeout': 5}
+>>> c.settings = {}
+>>> c.settings
+{}
+>>> del c.settings
+>>> del c.settings
+Traceback (most recent call last):
+    ...
+AttributeError: settings
+
+=========================
+=== Persisted results ===
+=========================
+
+Values that are expensive to derive can be kept on disk so that other
+processes load them instead of recomputing.  Passing persist (a name)
+stores results in a DiskStore, keyed by the name, the class (module and
+name), the version and, if given, the result of fingerprint(target).
+Instance values always need a fingerprint since instances have no
+identity across processes:
+
+>>> store = DiskStore(tempfile.mkdtemp())
+>>> def define():
+...     class Grammar(object):
+...         @classcached(persist='rules', version=1, store=store)
+...         def rules(cls):
+...             print 'Parsing grammar'
+...             return {'expr': ('term', '+', 'term')}
+...     return Grammar
+...
+>>> define().rules
+Parsing grammar
+{'expr': ('term', '+', 'term')}
+>>> define().rules
+{'expr': ('term', '+', 'term')}
+
+>>> class Document(object):
+...     def __init__(self, text):
+...         self.text = text
+...
+...     @cached(persist='words', fingerprint=lambda doc: doc.text,
+...             store=store)
+...     def words(self):
+...         print 'Splitting'
+...         return self.text.split()
+...
+>>> Document('a b c').words
+Splitting
+['a', 'b', 'c']
+>>> Document('a b c').words
+['a', 'b', 'c']
+>>> cached(persist='words')(lambda self: None)
+Traceback (most recent call last):
+    ...
+TypeError: Persisted cached values need a fingerprint
+
+With a ttl, the expiry time is stored along with the value, so expired
+values are recomputed rather than loaded again:
+
+>>> now = [0]
+>>> class Feed(object):
+...     @cached(ttl=10, clock=lambda: now[0], persist='feed',
+...             fingerprint=lambda feed: 'main', store=store)
+...     def items(self):
+...         print 'Fetching'
+...         return [now[0]]
+...
+>>> Feed().items
+Fetching
+[0]
+>>> Feed().items
+[0]
+>>> now[0] = 10
+>>> Feed().items
+Fetching
+[10]
+
+==============================
+=== Stale-while-revalidate ===
+==============================
+
+With refresh='background', callers are not held up when a value expires:
+the stale value is returned immediately while one recomputation runs on a
+shared thread pool and swaps in the new value when done.  Errors are
+logged and the stale value is kept (and refreshed again on the next
+access).
+
+>>> now = [0]
+>>> class Counter(object):
+...     count = 0
+...
+...     @cached(ttl=10, clock=lambda: now[0], refresh='background')
+...     def total(self):
+...         self.count += 1
+...         return self.count
+...
+>>> c = Counter()
+>>> c.total
+1
+>>> now[0] = 10
+>>> c.total
+1
+>>> while REFRESHING: time.sleep(.01)
+>>> c.total
+2
+
+A ttl is required for background refreshes:
+
+>>> cached(refresh='background')(lambda self: None)
+Traceback (most recent call last):
+    ...
+TypeError: Background refresh requires a ttl
+
+======================================
+=== Bounded (LRU) cache registries ===
+======================================
+
+Results can also be tracked by a CacheRegistry which evicts the least
+recently used values once it holds more than maxsize values or more than
+budget bytes (see deepsizeof).  Registries also count hits and
+misses and can drop values in bulk (see CacheRegistry).  Passing
+registry=True uses the process-wide cached.registry, which is unbounded
+until configured:
+
+>>> registry = CacheRegistry(maxsize=2)
+>>> class Table(object):
+...     def __init__(self, name):
+...         self.name = name
+...
+...     @classcached(registry=registry)
+...     def rows(cls):
+...         print "Loading", cls.__name__
+...         return range(3)
+...
+>>> class Users(Table): pass
+>>> class Groups(Table): pass
+>>> class Roles(Table): pass
+>>> Users.rows
+Loading Users
+[0, 1, 2]
+>>> Groups.rows
+Loading Groups
+[0, 1, 2]
+>>> Users.rows
+[0, 1, 2]
+>>> Roles.rows
+Loading Roles
+[0, 1, 2]
+>>> len(registry)
+2
+>>> Users.rows
+[0, 1, 2]
+>>> Groups.rows
+Loading Groups
+[0, 1, 2]
 '''
 
 from __version__ import *
-import types, sys
+from collections import OrderedDict, namedtuple
+import types, sys, os, time, weakref, threading, logging
+import cPickle, hashlib, tempfile
+
+log = logging.getLogger(__name__)
 
 class Volatile(object):
     __slots__ = ['obj']
@@ -84,7 +347,760 @@ class Volatile(object):
     def __init__(self, obj):
         self.obj = obj
 
-def cached(fn, Volailte=Volatile):
+def deepsizeof(obj):
+    '''
+    Approximates the memory held by obj by adding up sys.getsizeof for it
+    and everything reachable through dicts, lists, tuples and sets.  Other
+    objects are counted without what they refer to (following __dict__
+    could walk a whole application), each object is only counted once,
+    and classes, modules and functions are not counted at all since they
+    are shared.
+
+    >>> deepsizeof([]) == sys.getsizeof([])
+    True
+    >>> s = 'x' * 100
+    >>> deepsizeof([s, s]) == sys.getsizeof([s, s]) + sys.getsizeof(s)
+    True
+    '''
+
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.iterkeys())
+            stack.extend(obj.itervalues())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return total
+
+SHARED_TYPES = (type, types.ModuleType, types.FunctionType,
+                types.MethodType, types.BuiltinFunctionType)
+
+CacheStats = namedtuple('CacheStats',
+                        'cls name values size hits misses volatile')
+
+class CacheRegistry(object):
+    '''
+    Tracks cached values in least-recently-used order.  Once more than
+    maxsize values or more than budget bytes (as estimated by sizeof,
+    which defaults to deepsizeof while there is a budget and otherwise to
+    sys.getsizeof) are held, the oldest values are dropped from their
+    owners and will be recomputed on next access.  Owners are only weakly
+    referenced and so must support weak references.
+
+    >>> registry = CacheRegistry(budget=100, sizeof=len)
+    >>> class Blob(object):
+    ...     def __init__(self, size):
+    ...         self.size = size
+    ...
+    ...     @cached(registry=registry)
+    ...     def data(self):
+    ...         return 'x' * self.size
+    ...
+    >>> a, b = Blob(60), Blob(30)
+    >>> len(a.data), len(b.data), registry.size
+    (60, 30, 90)
+    >>> c = Blob(20)
+    >>> len(c.data), registry.size
+    (20, 50)
+    >>> ('data',) in a.__dict__, len(registry)
+    (False, 2)
+
+    Values are forgotten when their owner goes away:
+
+    >>> del b
+    >>> len(registry), registry.size
+    (1, 20)
+
+    Each registry also keeps hit, miss and volatile counts per class and
+    attribute, which report() returns along with the number and estimated
+    size of the values currently held:
+
+    >>> for stat in registry.report():
+    ...     print stat.cls.__name__, stat.name, stat.values, stat.size,
+    ...     print stat.hits, stat.misses, stat.volatile
+    Blob data 1 20 0 3 0
+    >>> c.data == 'x' * 20
+    True
+    >>> registry.report()[0].hits
+    1
+
+    Classes are only weakly referenced as well, so the counts of classes
+    created at runtime go away with them:
+
+    >>> import gc
+    >>> class Scratch(Blob):
+    ...     pass
+    ...
+    >>> Scratch(5).data == 'x' * 5
+    True
+    >>> len(registry.report())
+    2
+    >>> del Scratch
+    >>> _ = gc.collect()
+    >>> len(registry.report())
+    1
+
+    Values can be dropped in bulk, optionally limited to a class (and its
+    subclasses) and/or an attribute name.  The number of values dropped is
+    returned:
+
+    >>> a.data == 'x' * 60
+    True
+    >>> registry.clear(cls=Blob, name='other')
+    0
+    >>> registry.clear(cls=Blob)
+    2
+    >>> registry.size, ('data',) in c.__dict__
+    (0, False)
+    >>> registry.clear_all()
+    0
+    '''
+
+    def __init__(self, maxsize=None, budget=None, sizeof=None):
+        self.maxsize = maxsize
+        self.budget = budget
+        self.sizeof = sizeof
+        self.entries = OrderedDict()
+        # Counts by class (weakly, so that classes created at runtime can
+        # go away) and attribute name.
+        self.stats = weakref.WeakKeyDictionary()
+        self.size = 0
+        # Background refreshes add values from other threads, and owners
+        # going away remove them from wherever garbage is collected.
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def counts(self, owner, name):
+        cls = owner if isinstance(owner, type) else type(owner)
+        names = self.stats.get(cls)
+        if names is None:
+            names = self.stats[cls] = {}
+        counts = names.get(name)
+        if counts is None:
+            counts = names[name] = [0, 0, 0]
+        return counts
+
+    def add(self, owner, name, value, drop):
+        key = id(owner), name
+        sizeof = self.sizeof
+        if sizeof is None:
+            sizeof = sys.getsizeof if self.budget is None else deepsizeof
+        size = sizeof(value)
+        cls = owner if isinstance(owner, type) else type(owner)
+        with self.lock:
+            self.remove(key)
+            ref = weakref.ref(owner, lambda r: self.remove(key))
+            self.entries[key] = (ref, size, drop, weakref.ref(cls))
+            self.size += size
+            self.evict()
+
+    def touch(self, owner, name):
+        key = id(owner), name
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
+            self.counts(owner, name)[0] += 1
+
+    def missed(self, owner, name, volatile=False):
+        with self.lock:
+            counts = self.counts(owner, name)
+            counts[1] += 1
+            if volatile:
+                counts[2] += 1
+
+    def discard(self, owner, name):
+        self.remove((id(owner), name))
+
+    def remove(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+            return entry
+
+    def evict(self):
+        entries = self.entries
+        with self.lock:
+            while entries and (
+                    (self.maxsize is not None and
+                     len(entries) > self.maxsize) or
+                    (self.budget is not None and self.size > self.budget)):
+                key, (ref, size, drop, cls) = entries.popitem(last=False)
+                self.size -= size
+                owner = ref()
+                if owner is not None:
+                    drop(owner)
+
+    def clear(self, cls=None, name=None):
+        count = 0
+        with self.lock:
+            for key, entry in self.entries.items():
+                owner_cls = entry[3]()
+                if ((name is None or key[1] == name) and
+                    (cls is None or owner_cls is not None and
+                     issubclass(owner_cls, cls))):
+                    self.remove(key)
+                    owner = entry[0]()
+                    if owner is not None:
+                        entry[2](owner)
+                        count += 1
+        return count
+
+    def clear_all(self):
+        return self.clear()
+
+    def report(self):
+        values = {}
+        with self.lock:
+            for key, (ref, size, drop, cls) in self.entries.iteritems():
+                held = values.setdefault((cls(), key[1]), [0, 0])
+                held[0] += 1
+                held[1] += size
+            stats = [((cls, name), list(counts))
+                     for cls, names in self.stats.items()
+                     for name, counts in names.iteritems()]
+        return [CacheStats(cls, name, *(values.get((cls, name), [0, 0]) +
+                                        counts))
+                for (cls, name), counts in sorted(
+                    stats, key=lambda item: (item[0][0].__name__,
+                                             item[0][1]))]
+
+REGISTRY = CacheRegistry()
+
+REFRESH_POOL = None
+REFRESH_THREADS = 4
+REFRESHING = set()
+REFRESH_LOCK = threading.Lock()
+
+def refresh_pool():
+    '''
+    Returns the thread pool shared by all background refreshes, creating
+    it (with REFRESH_THREADS workers) on first use.
+    '''
+    global REFRESH_POOL
+    with REFRESH_LOCK:
+        if REFRESH_POOL is None:
+            from multiprocessing.pool import ThreadPool
+            REFRESH_POOL = ThreadPool(REFRESH_THREADS)
+        return REFRESH_POOL
+
+NOT_FOUND = object()
+
+class DiskStore(object):
+    '''
+    A directory of pickled values shared between processes.  Each value
+    is written to a temporary file and renamed into place, so concurrent
+    writers never leave a partially written value behind (the last writer
+    wins) and readers see either the old or the new value.  Unreadable
+    values are treated as missing.
+
+    >>> store = DiskStore(tempfile.mkdtemp())
+    >>> store.load(('a', 1), 'missing')
+    'missing'
+    >>> store.save(('a', 1), {'hello': 'world'})
+    >>> store.load(('a', 1))
+    {'hello': 'world'}
+    >>> store.remove(('a', 1))
+    >>> store.load(('a', 1)) is None
+    True
+
+    Since loading unpickles, the directory is created readable only by its
+    owner, and values are only loaded when both the directory and the file
+    belong to the current user and cannot be written by anyone else.  The
+    default directory is per user (under $XDG_CACHE_HOME or ~/.cache).
+
+    >>> store.save(('a', 2), 'planted')
+    >>> os.chmod(store.filename(('a', 2)), 0666)
+    >>> store.load(('a', 2), 'untrusted')
+    'untrusted'
+    '''
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.environ.get('BULLWINKLE_CACHE_DIR')
+        if path is None:
+            base = (os.environ.get('XDG_CACHE_HOME') or
+                    os.path.join(os.path.expanduser('~'), '.cache'))
+            path = os.path.join(base, 'bullwinkle', str(VERSION))
+        self.path = path
+
+    def filename(self, key):
+        return os.path.join(self.path,
+                            hashlib.sha1(repr(key)).hexdigest() + '.pickle')
+
+    def trusted(self, filename):
+        '''
+        Returns whether the directory and filename are owned by the current
+        user and not writable by others.
+        '''
+
+        if not hasattr(os, 'getuid'):
+            return True
+        uid = os.getuid()
+        for stat in (os.stat(self.path), os.lstat(filename)):
+            if stat.st_uid != uid or stat.st_mode & 022:
+                return False
+        return True
+
+    def load(self, key, default=None):
+        filename = self.filename(key)
+        try:
+            if not self.trusted(filename):
+                return default
+            with open(filename, 'rb') as f:
+                stored_key, value = cPickle.load(f)
+        except Exception:
+            return default
+        return value if stored_key == key else default
+
+    def save(self, key, value):
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path, 0700)
+            except OSError:
+                if not os.path.isdir(self.path):
+                    raise
+        f = tempfile.NamedTemporaryFile(dir=self.path, suffix='.tmp',
+                                        delete=False)
+        try:
+            with f:
+                cPickle.dump((key, value), f, cPickle.HIGHEST_PROTOCOL)
+            filename = self.filename(key)
+            if os.name == 'nt' and os.path.exists(filename):
+                os.remove(filename)
+            os.rename(f.name, filename)
+        except:
+            os.remove(f.name)
+            raise
+
+    def remove(self, key):
+        try:
+            os.remove(self.filename(key))
+        except OSError:
+            pass
+
+STORE = DiskStore()
+
+class Persistence(object):
+    '''
+    Describes how a cached value is kept in a DiskStore: the persist name
+    and version plus, optionally, a fingerprint function of the owning
+    class or instance whose result becomes part of the key.
+    '''
+
+    __slots__ = ('name', 'version', 'fingerprint', 'store')
+
+    def __init__(self, name, version=None, fingerprint=None, store=None):
+        self.name = name
+        self.version = version
+        self.fingerprint = fingerprint
+        self.store = STORE if store is None else store
+
+    def key(self, target):
+        cls = target if isinstance(target, type) else type(target)
+        key = (self.name, cls.__module__, cls.__name__, self.version)
+        if self.fingerprint is not None:
+            key += (self.fingerprint(target),)
+        return key
+
+    def compute(self, fn, target, ttl=None, clock=time.time,
+                      Volatile=Volatile, NOT_FOUND=NOT_FOUND):
+        '''
+        Returns the stored value for target, if it has not expired, or
+        else the result of fn(target), storing it unless it is volatile.
+        The expiry time (None for no ttl) is returned with the value.
+        '''
+
+        key = self.key(target)
+        entry = self.store.load(key, NOT_FOUND)
+        if entry is not NOT_FOUND and (entry[1] is None or
+                                       clock() < entry[1]):
+            return entry
+        obj = fn(target)
+        expires = None if ttl is None else clock() + ttl
+        if type(obj) is not Volatile:
+            self.store.save(key, (obj, expires))
+        return obj, expires
+
+def slotname(name):
+    '''
+    Returns the name of the hidden slot used to hold the cached value of
+    name on __slots__ classes.
+
+    >>> slotname('value')
+    '_cached_value'
+    '''
+    return '_cached_' + name
+
+class FunctionDoc(object):
+    '''
+    Stands in for the __doc__ of descriptor classes, giving instances the
+    docstring of their function while the class keeps its own.
+    '''
+
+    __slots__ = ('doc',)
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self.doc
+        return obj.fn.__doc__
+
+    def __set__(self, obj, value):
+        raise AttributeError('__doc__')
+
+class DescriptorType(type):
+    def __new__(meta, typename, typebases, typedict):
+        typedict['__doc__'] = FunctionDoc(typedict.get('__doc__'))
+        return super(DescriptorType, meta).__new__(meta, typename,
+                                                   typebases, typedict)
+
+class CachedDescriptor(object):
+    '''
+    Shared implementation of the cached decorators.  Results are kept in
+    the instance __dict__ when there is one, so for plain cached values a
+    hit is an ordinary instance attribute lookup that never reaches
+    __get__.  Instances without a __dict__ use the hidden slotname() slot
+    instead.  Instances have the __doc__ of their function:
+
+    >>> class Page(object):
+    ...     @cached
+    ...     def title(self):
+    ...         'The page title'
+    ...
+    >>> Page.__dict__['title'].__doc__
+    'The page title'
+
+    Where results go is decided for each concrete class, so one descriptor
+    can serve classes with and without a __dict__:
+
+    >>> class Shape(object):
+    ...     __slots__ = ()
+    ...
+    ...     @cached
+    ...     def area(self):
+    ...         return self.w * self.h
+    ...
+    >>> class Box(Shape):
+    ...     w, h = 2, 3
+    ...
+    >>> class Tile(Shape):
+    ...     __slots__ = (slotname('area'),)
+    ...     w, h = 1, 1
+    ...
+    >>> Box().area, Tile().area
+    (6, 1)
+
+    Descriptors start out handling assignment and deletion themselves.
+    Once a result is stored in an instance __dict__ they step aside so
+    that later hits are plain attribute lookups, unless they have met a
+    class without a __dict__, whose results only they can reach.
+    '''
+
+    __metaclass__ = DescriptorType
+    __slots__ = ('fn', 'name', 'key', 'hidden', 'pinned', 'persist')
+    plain = slotted = None
+
+    def __init__(self, fn, persist=None):
+        self.fn = fn
+        self.name = self.key = fn.__name__
+        self.hidden = slotname(self.name)
+        self.pinned = False
+        self.persist = persist
+        if self.slotted is not None:
+            self.__class__ = self.slotted
+
+    def compute(self, target):
+        if self.persist is None:
+            return self.fn(target)
+        else:
+            return self.persist.compute(self.fn, target)[0]
+
+    def compute_entry(self, target, ttl, clock):
+        '''
+        Returns the value for target with its expiry time after ttl
+        (None for no ttl), which persisted values keep across processes.
+        '''
+
+        if self.persist is None:
+            obj = self.fn(target)
+            return obj, None if ttl is None else clock() + ttl
+        else:
+            return self.persist.compute(self.fn, target, ttl, clock)
+
+    def __bindslots__(self, name):
+        return (slotname(self.name),)
+
+    def __bindclass__(self, cls, name):
+        if self.slotted is None:
+            pass
+        elif cls.__dictoffset__:
+            self.unpin()
+        else:
+            self.getslot(cls)
+
+    def unpin(self):
+        # Let instance __dict__ hits bypass the descriptor unless a class
+        # without one has been seen.
+        if not self.pinned and self.plain is not None:
+            self.__class__ = self.plain
+
+    def getslot(self, cls, MemberDescriptorType=types.MemberDescriptorType):
+        slot = getattr(cls, self.hidden, None)
+        if type(slot) is not MemberDescriptorType:
+            raise TypeError('%r needs a %r slot to cache %r' %
+                            (cls.__name__, self.hidden, self.name))
+        slotted = self.slotted
+        if slotted is not None and (not self.pinned or
+                                    type(self) is not slotted):
+            self.pinned = True
+            self.__class__ = slotted
+        return slot
+
+    def load(self, target, NOT_FOUND=NOT_FOUND):
+        cls = type(target)
+        if cls.__dictoffset__:
+            return target.__dict__.get(self.key, NOT_FOUND)
+        try:
+            return self.getslot(cls).__get__(target)
+        except AttributeError:
+            return NOT_FOUND
+
+    def store(self, target, obj):
+        cls = type(target)
+        if cls.__dictoffset__:
+            target.__dict__[self.key] = obj
+            self.unpin()
+        else:
+            self.getslot(cls).__set__(target, obj)
+
+    def drop(self, target, NOT_FOUND=NOT_FOUND):
+        cls = type(target)
+        if cls.__dictoffset__:
+            return target.__dict__.pop(self.key, NOT_FOUND) is not NOT_FOUND
+        try:
+            self.getslot(cls).__delete__(target)
+        except AttributeError:
+            return False
+        return True
+
+    def bind(self, obj, target):
+        return obj
+
+    def __get__(self, target, cls=None, Volatile=Volatile,
+                      NOT_FOUND=NOT_FOUND):
+        if target is None:
+            return self.fn
+        obj = self.load(target)
+        if obj is NOT_FOUND:
+            obj = self.compute(target)
+            if type(obj) is Volatile:
+                return obj.obj
+            obj = self.bind(obj, target)
+            self.store(target, obj)
+        return obj
+
+class SlottedDescriptor(object):
+    '''
+    Adds assignment and deletion for cached values kept in slots.
+    '''
+
+    __slots__ = ()
+
+    def __set__(self, target, obj):
+        self.store(target, obj)
+
+    def __delete__(self, target):
+        if not self.drop(target):
+            raise AttributeError(self.name)
+
+class Cached(CachedDescriptor):
+    __slots__ = ()
+
+class SlottedCached(SlottedDescriptor, Cached):
+    __slots__ = ()
+Cached.plain, Cached.slotted = Cached, SlottedCached
+
+class CachedMethod(CachedDescriptor):
+    __slots__ = ()
+
+    def bind(self, obj, target, MethodType=types.MethodType):
+        return MethodType(obj, target, type(target))
+
+class SlottedCachedMethod(SlottedDescriptor, CachedMethod):
+    __slots__ = ()
+CachedMethod.plain, CachedMethod.slotted = CachedMethod, SlottedCachedMethod
+
+class ClassCached(CachedDescriptor):
+    __slots__ = ()
+
+    def __bindslots__(self, name):
+        return ()
+
+    def __bindclass__(self, cls, name):
+        pass
+
+    def __get__(self, target, cls=None, Volatile=Volatile):
+        target = cls or type(target)
+        obj = self.compute(target)
+        if type(obj) is not Volatile:
+            setattr(target, self.name, obj)
+            return obj
+        else:
+            return obj.obj
+
+class Expiring(SlottedDescriptor, CachedDescriptor):
+    '''
+    Used by cached and cachedmethod when a ttl or registry is given.
+    Results are stored under (name,) along with their expiry time so that
+    every access is seen by the descriptor.
+
+    With refresh='background', an expired value is still returned while a
+    single recomputation per value runs on the shared refresh_pool().
+    '''
+
+    __slots__ = ('ttl', 'clock', 'registry', 'method', 'refresh')
+
+    def __init__(self, fn, ttl=None, clock=time.time, registry=None,
+                       method=False, refresh=None, persist=None):
+        super(Expiring, self).__init__(fn, persist)
+        if refresh not in (None, 'background'):
+            raise TypeError('Unknown refresh mode %r' % (refresh,))
+        elif refresh and ttl is None:
+            raise TypeError('Background refresh requires a ttl')
+        self.key = self.name,
+        self.ttl = ttl
+        self.clock = clock
+        self.registry = REGISTRY if registry is True else registry
+        self.method = method
+        self.refresh = refresh
+
+    def __bindclass__(self, cls, name):
+        pass
+
+    def bind(self, obj, target, MethodType=types.MethodType):
+        if self.method:
+            return MethodType(obj, target, type(target))
+        else:
+            return obj
+
+    def __get__(self, target, cls=None, Volatile=Volatile,
+                      NOT_FOUND=NOT_FOUND):
+        if target is None:
+            return self.fn
+        entry = self.load(target)
+        if entry is not NOT_FOUND:
+            if entry[1] is None or self.clock() < entry[1]:
+                if self.registry is not None:
+                    self.registry.touch(target, self.name)
+                return entry[0]
+            elif self.refresh:
+                self.revalidate(target)
+                return entry[0]
+        obj, expires = self.compute_entry(target, self.ttl, self.clock)
+        if type(obj) is Volatile:
+            if self.registry is not None:
+                self.registry.missed(target, self.name, True)
+            return obj.obj
+        if self.registry is not None:
+            self.registry.missed(target, self.name)
+        obj = self.bind(obj, target)
+        self.set_entry(target, obj, expires)
+        return obj
+
+    def revalidate(self, target):
+        key = id(target), self.name
+        with REFRESH_LOCK:
+            if key in REFRESHING:
+                return
+            REFRESHING.add(key)
+        refresh_pool().apply_async(self.recompute, (target, key))
+
+    def recompute(self, target, key, Volatile=Volatile):
+        try:
+            obj, expires = self.compute_entry(target, self.ttl, self.clock)
+            if type(obj) is not Volatile:
+                self.set_entry(target, self.bind(obj, target), expires)
+        except Exception:
+            log.exception('Error refreshing %r, keeping stale value',
+                          self.name)
+        finally:
+            with REFRESH_LOCK:
+                REFRESHING.discard(key)
+
+    def __set__(self, target, obj):
+        ttl = self.ttl
+        self.set_entry(target, obj,
+                       None if ttl is None else self.clock() + ttl)
+
+    def set_entry(self, target, obj, expires):
+        self.store(target, (obj, expires))
+        if self.registry is not None:
+            self.registry.add(target, self.name, obj, self.drop)
+
+    def __delete__(self, target):
+        if not self.drop(target):
+            raise AttributeError(self.name)
+        if self.registry is not None:
+            self.registry.discard(target, self.name)
+
+class ClassExpiring(CachedDescriptor):
+    '''
+    Used by classcached when a ttl or registry is given.
+    '''
+
+    __slots__ = ('ttl', 'clock', 'registry', 'values')
+
+    def __init__(self, fn, ttl=None, clock=time.time, registry=None,
+                       persist=None):
+        super(ClassExpiring, self).__init__(fn, persist)
+        self.ttl = ttl
+        self.clock = clock
+        self.registry = REGISTRY if registry is True else registry
+        self.values = weakref.WeakKeyDictionary()
+
+    def __bindslots__(self, name):
+        return ()
+
+    def __bindclass__(self, cls, name):
+        pass
+
+    def drop(self, target):
+        return self.values.pop(target, NOT_FOUND) is not NOT_FOUND
+
+    def __get__(self, target, cls=None, Volatile=Volatile):
+        target = cls or type(target)
+        entry = self.values.get(target)
+        if entry is not None:
+            if entry[1] is None or self.clock() < entry[1]:
+                if self.registry is not None:
+                    self.registry.touch(target, self.name)
+                return entry[0]
+        obj, expires = self.compute_entry(target, self.ttl, self.clock)
+        if self.registry is not None:
+            self.registry.missed(target, self.name, type(obj) is Volatile)
+        if type(obj) is Volatile:
+            return obj.obj
+        self.values[target] = (obj, expires)
+        if self.registry is not None:
+            self.registry.add(target, self.name, obj, self.drop)
+        return obj
+
+def cached(fn=None, ttl=None, clock=time.time, registry=None, refresh=None,
+           persist=None, version=None, fingerprint=None, store=None,
+           Volailte=Volatile):
     '''
     Decorates a method that (normally) should only be called once to
     compute the value of an attribute.  Once called, unless the function
@@ -124,24 +1140,24 @@ def cached(fn, Volailte=Volatile):
     Hello world
     '''
 
-    name = fn.__name__
-    def wrapper(self, target, cls=None):
-        if target is None:
-            return fn
-        else:
-            obj = fn(target)
-            if type(obj) is not Volatile:
-                target.__dict__[name] = obj
-                return obj
-            else:
-                return obj.obj
-    cls = type(fn.__name__,
-               (object,),
-               dict(__doc__=fn.__doc__, __get__=wrapper))
-    return cls()
+    if fn is None:
+        return lambda f: cached(f, ttl, clock, registry, refresh, persist,
+                                version, fingerprint, store)
+    if persist is not None:
+        if fingerprint is None:
+            raise TypeError('Persisted cached values need a fingerprint')
+        persist = Persistence(persist, version, fingerprint, store)
+    if ttl is not None or registry is not None or refresh is not None:
+        return Expiring(fn, ttl, clock, registry, refresh=refresh,
+                        persist=persist)
+    else:
+        return Cached(fn, persist)
 cached.volatile = Volatile
+cached.registry = REGISTRY
 
-def classcached(fn, Volailte=Volatile):
+def classcached(fn=None, ttl=None, clock=time.time, registry=None,
+                persist=None, version=None, fingerprint=None, store=None,
+                Volailte=Volatile):
     '''
     Decorates a class method that (normally) should only be called once to
     compute the value of an attribute.  Once called, unless the function
@@ -186,24 +1202,41 @@ def classcached(fn, Volailte=Volatile):
     >>> dl.docs
     Loading docs
     'Hello world'
+
+    With a ttl or registry, results are kept by the decorator itself
+    (weakly keyed by class) rather than replacing the class attribute:
+
+    >>> now = [0]
+    >>> class Schema(object):
+    ...     @classcached(ttl=60, clock=lambda: now[0])
+    ...     def fields(cls):
+    ...         print 'Parsing schema'
+    ...         return ('id', 'name')
+    ...
+    >>> Schema.fields
+    Parsing schema
+    ('id', 'name')
+    >>> Schema().fields
+    ('id', 'name')
+    >>> now[0] = 60
+    >>> Schema.fields
+    Parsing schema
+    ('id', 'name')
     '''
 
-    name = fn.__name__
-    def wrapper(self, target, cls=None):
-        target = cls or type(target)
-        obj = fn(target)
-        if type(obj) is not Volatile:
-            setattr(target, name, obj)
-            return obj
-        else:
-            return obj.obj
-    cls = type(fn.__name__,
-               (object,),
-               dict(__doc__=fn.__doc__, __get__=wrapper))
-    return cls()
+    if fn is None:
+        return lambda f: classcached(f, ttl, clock, registry, persist,
+                                     version, fingerprint, store)
+    if persist is not None:
+        persist = Persistence(persist, version, fingerprint, store)
+    if ttl is not None or registry is not None:
+        return ClassExpiring(fn, ttl, clock, registry, persist)
+    else:
+        return ClassCached(fn, persist)
 classcached.volatile = Volatile
 
-def cachedmethod(fn, Volailte=Volatile):
+def cachedmethod(fn=None, ttl=None, clock=time.time, registry=None,
+                 refresh=None, Volailte=Volatile):
     '''
     Decorates a function that produces a method dynamically.  This is used
     for closure-based actviities that generate inline functions based on
@@ -247,21 +1280,471 @@ def cachedmethod(fn, Volailte=Volatile):
     -2
     '''
 
-    name = fn.__name__
-    def wrapper(self, target, cls=None, MethodType=types.MethodType):
-        if target is None:
-            return fn
-        else:
-            obj = fn(target)
-            if type(obj) is not Volatile:
-                obj = MethodType(obj, target, type(target))
-                target.__dict__[name] = obj
-                return obj
+    if fn is None:
+        return lambda f: cachedmethod(f, ttl, clock, registry, refresh)
+    elif ttl is not None or registry is not None or refresh is not None:
+        return Expiring(fn, ttl, clock, registry, method=True,
+                        refresh=refresh)
+    else:
+        return CachedMethod(fn)
+cachedmethod.volatile = Volatile
+
+class MemoCache(object):
+    '''
+    Holds the memoized results of a memomethod for one instance, in least
+    recently used order, along with hit and miss counters.
+    '''
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    def __repr__(self):
+        return '<MemoCache hits=%d misses=%d size=%d>' % (
+            self.hits, self.misses, len(self.results))
+
+    def clear(self):
+        self.results.clear()
+
+class MemoMethod(CachedDescriptor):
+    __slots__ = ('maxsize', 'keyfn')
+
+    def __init__(self, fn, maxsize=128, key=None):
+        super(MemoMethod, self).__init__(fn)
+        self.maxsize = maxsize
+        self.keyfn = key
+
+    def bind(self, obj, target, Volatile=Volatile):
+        fn = self.fn
+        key = self.keyfn
+        maxsize = self.maxsize
+        cache = MemoCache(maxsize)
+        results = cache.results
+        def memo(*_args, **_kw):
+            if key is not None:
+                k = key(*_args, **_kw)
+            elif _kw:
+                k = _args, frozenset(_kw.iteritems())
             else:
+                k = _args
+            obj = results.pop(k, Volatile)
+            if obj is not Volatile:
+                cache.hits += 1
+                results[k] = obj
+                return obj
+            cache.misses += 1
+            obj = fn(target, *_args, **_kw)
+            if type(obj) is Volatile:
                 return obj.obj
-    cls = type(fn.__name__,
-               (object,),
-               dict(__doc__=fn.__doc__, __get__=wrapper))
-    return cls()
-cachedmethod.volatile = Volatile
+            results[k] = obj
+            if maxsize is not None and len(results) > maxsize:
+                results.popitem(last=False)
+            return obj
+        memo.__name__ = self.name
+        memo.__doc__ = fn.__doc__
+        memo.cache = cache
+        return memo
+
+    def __get__(self, target, cls=None, NOT_FOUND=NOT_FOUND):
+        if target is None:
+            return self.fn
+        obj = self.load(target)
+        if obj is NOT_FOUND:
+            obj = self.bind(None, target)
+            self.store(target, obj)
+        return obj
+
+class SlottedMemoMethod(SlottedDescriptor, MemoMethod):
+    __slots__ = ()
+MemoMethod.plain, MemoMethod.slotted = MemoMethod, SlottedMemoMethod
+
+def memomethod(fn=None, maxsize=128, key=None, Volatile=Volatile):
+    '''
+    Decorates a method whose result depends only on its arguments.  Each
+    instance keeps up to maxsize results keyed by the call arguments
+    (hashed), discarding the least recently used beyond that.  A key
+    function can be given to derive the key from the arguments instead.
+    Returning memomethod.volatile skips caching for that call.
+
+    >>> class Scaler(object):
+    ...     def __init__(self, factor):
+    ...         self.factor = factor
+    ...
+    ...     @memomethod(maxsize=2)
+    ...     def scale(self, x, offset=0):
+    ...         print "Scaling", x
+    ...         if x < 0:
+    ...             return memomethod.volatile(0)
+    ...         return x * self.factor + offset
+    ...
+    >>> s = Scaler(3)
+    >>> s.scale(2)
+    Scaling 2
+    6
+    >>> s.scale(2)
+    6
+    >>> s.scale(2, offset=1)
+    Scaling 2
+    7
+    >>> s.scale(-1)
+    Scaling -1
+    0
+    >>> s.scale(-1)
+    Scaling -1
+    0
+    >>> s.scale(5)
+    Scaling 5
+    15
+    >>> s.scale(2)
+    Scaling 2
+    6
+    >>> s.scale.cache
+    <MemoCache hits=1 misses=6 size=2>
+
+    The cache is per instance and can be cleared (or dropped via del):
+
+    >>> Scaler(4).scale(2)
+    Scaling 2
+    8
+    >>> s.scale.cache.clear()
+    >>> s.scale(2)
+    Scaling 2
+    6
+    >>> del s.scale
+    >>> s.scale.cache
+    <MemoCache hits=0 misses=0 size=0>
+
+    A key function receives the same arguments as the method:
+
+    >>> class Lookup(object):
+    ...     @memomethod(key=lambda name: name.lower())
+    ...     def find(self, name):
+    ...         print "Finding", name
+    ...         return name.upper()
+    ...
+    >>> l = Lookup()
+    >>> l.find('abc')
+    Finding abc
+    'ABC'
+    >>> l.find('ABC')
+    'ABC'
+    '''
+
+    if fn is None:
+        return lambda f: memomethod(f, maxsize, key)
+    else:
+        return MemoMethod(fn, maxsize, key)
+memomethod.volatile = Volatile
+
+TRACKED = '__tracked__',
+
+class Recording(threading.local):
+    '''
+    The tracked_cached values being computed in this thread, innermost
+    last, as (instance, names read) pairs.
+    '''
+
+    def __init__(self):
+        self.frames = []
+
+RECORDING = Recording()
+
+def invalidate(obj, name, NOT_FOUND=NOT_FOUND):
+    '''
+    Drops the tracked_cached values of obj that read name, along with any
+    tracked_cached values that read those in turn.
+    '''
+    deps = obj.__dict__.get(TRACKED)
+    if deps:
+        names = [name]
+        while names:
+            for cached_name in deps.pop(names.pop(), ()):
+                if obj.__dict__.pop(cached_name, NOT_FOUND) is not NOT_FOUND:
+                    names.append(cached_name)
+
+# Classes whose __getattribute__ is recording reads, with the number of
+# computations needing it and their own __getattribute__ (if any).
+RECORDING_CLASSES = {}
+RECORDING_LOCK = threading.Lock()
+
+def start_recording(cls, NOT_FOUND=NOT_FOUND):
+    '''
+    Hooks __getattribute__ of cls to record the attributes read from the
+    instance whose tracked_cached value is being computed (see RECORDING)
+    until stop_recording is called as many times.
+    '''
+
+    with RECORDING_LOCK:
+        entry = RECORDING_CLASSES.get(cls)
+        if entry is not None:
+            entry[0] += 1
+            return
+        own = cls.__dict__.get('__getattribute__', NOT_FOUND)
+        base_getattribute = cls.__getattribute__
+        def __getattribute__(self, name, RECORDING=RECORDING):
+            frames = RECORDING.frames
+            if frames and frames[-1][0] is self:
+                frames[-1][1].add(name)
+            return base_getattribute(self, name)
+        RECORDING_CLASSES[cls] = [1, own]
+        type.__setattr__(cls, '__getattribute__', __getattribute__)
+
+def stop_recording(cls, NOT_FOUND=NOT_FOUND):
+    with RECORDING_LOCK:
+        entry = RECORDING_CLASSES[cls]
+        entry[0] -= 1
+        if not entry[0]:
+            del RECORDING_CLASSES[cls]
+            if entry[1] is NOT_FOUND:
+                type.__delattr__(cls, '__getattribute__')
+            else:
+                type.__setattr__(cls, '__getattribute__', entry[1])
+
+class TrackedAttribute(object):
+    '''
+    Stands in for an instance attribute read by tracked_cached values,
+    dropping those values when it is assigned or deleted.  Instances
+    without a value see default (the class attribute it replaced), if any.
+    '''
+
+    __slots__ = ('name', 'default')
+
+    def __init__(self, name, default=NOT_FOUND):
+        self.name = name
+        self.default = default
+
+    def __get__(self, obj, cls=None, NOT_FOUND=NOT_FOUND):
+        if obj is None:
+            obj = self.default
+        else:
+            obj = obj.__dict__.get(self.name, self.default)
+        if obj is NOT_FOUND:
+            raise AttributeError(self.name)
+        return obj
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+        invalidate(obj, self.name)
+
+    def __delete__(self, obj):
+        try:
+            del obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+        invalidate(obj, self.name)
+
+class TrackedDescriptor(object):
+    '''
+    Wraps a data descriptor (such as a BWObject member) read by
+    tracked_cached values, dropping those values when it is assigned or
+    deleted.
+    '''
+
+    __slots__ = ('name', 'descr')
+
+    def __init__(self, name, descr):
+        self.name = name
+        self.descr = descr
+
+    def __get__(self, obj, cls=None):
+        return self.descr.__get__(obj, cls)
+
+    def __set__(self, obj, value):
+        self.descr.__set__(obj, value)
+        invalidate(obj, self.name)
+
+    def __delete__(self, obj):
+        self.descr.__delete__(obj)
+        invalidate(obj, self.name)
+
+def track_attribute(cls, name, NOT_FOUND=NOT_FOUND):
+    '''
+    Has assigning or deleting name on instances of cls invalidate the
+    tracked_cached values reading it.  Methods and other attributes that
+    cannot be assigned through the class are left alone.
+    '''
+
+    if name.startswith('__'):
+        return
+    for base in cls.__mro__:
+        attr = base.__dict__.get(name, NOT_FOUND)
+        if attr is not NOT_FOUND:
+            break
+    if type(attr) in (TrackedAttribute, TrackedDescriptor, TrackedCached):
+        return
+    elif attr is NOT_FOUND or not hasattr(attr, '__get__'):
+        tracker = TrackedAttribute(name, attr)
+    elif not hasattr(attr, '__set__'):
+        return
+    elif (isinstance(attr, property) and attr.fset is None and
+          attr.fdel is None):
+        return
+    else:
+        tracker = TrackedDescriptor(name, attr)
+    type.__setattr__(cls, name, tracker)
+
+class TrackedCached(Cached):
+    __slots__ = ()
+    plain = slotted = None
+
+    def __bindslots__(self, name):
+        return ()
+
+    def __bindclass__(self, cls, name):
+        self.getslot(cls)
+
+    def getslot(self, cls):
+        if not cls.__dictoffset__:
+            raise TypeError('%r needs a __dict__ for tracked_cached values' %
+                            (cls.__name__,))
+        return False
+
+    def compute(self, target, Volatile=Volatile):
+        cls = type(target)
+        reads = set()
+        frames = RECORDING.frames
+        frames.append((target, reads))
+        start_recording(cls)
+        try:
+            obj = self.fn(target)
+        finally:
+            stop_recording(cls)
+            frames.pop()
+        if type(obj) is not Volatile:
+            for name in reads:
+                track_attribute(cls, name)
+            deps = target.__dict__.setdefault(TRACKED, {})
+            for name in reads:
+                deps.setdefault(name, set()).add(self.name)
+        return obj
+
+def tracked_cached(fn):
+    '''
+    Like cached, but records the attributes (including BWObject members)
+    read from the instance while computing the value, also from its
+    methods and properties, and drops the value when any of them is
+    assigned or deleted.  Reads are only recorded while a value is being
+    computed.  The attributes read are then replaced on the class with
+    descriptors that invalidate on assignment and deletion, so instances
+    need a __dict__.  Other attributes and cache hits are unaffected.
+
+    >>> class Rectangle(object):
+    ...     def __init__(self, width, height):
+    ...         self.width = width
+    ...         self.height = height
+    ...
+    ...     def perimeter(self):
+    ...         return 2 * (self.width + self.height)
+    ...
+    ...     @tracked_cached
+    ...     def area(self):
+    ...         print "Computing area"
+    ...         return self.width * self.height
+    ...
+    ...     @tracked_cached
+    ...     def summary(self):
+    ...         print "Computing summary"
+    ...         return '%s/%s' % (self.area, self.perimeter())
+    ...
+    >>> r = Rectangle(2, 3)
+    >>> r.summary
+    Computing summary
+    Computing area
+    '6/10'
+    >>> r.summary
+    '6/10'
+    >>> r.height = 4
+    >>> r.summary
+    Computing summary
+    Computing area
+    '8/12'
+    >>> r.unrelated = True
+    >>> r.summary
+    '8/12'
+
+    BWObject members are tracked the same way:
+
+    >>> from bwobject import BWObject
+    >>> from bwmember import member
+    >>> class Greeting(BWObject):
+    ...     name = member(str)
+    ...
+    ...     @tracked_cached
+    ...     def text(self):
+    ...         print "Building text"
+    ...         return 'Hello ' + self.name
+    ...
+    >>> g = Greeting(name='world')
+    >>> g.text
+    Building text
+    'Hello world'
+    >>> g.name = 'there'
+    >>> g.text
+    Building text
+    'Hello there'
+    >>> g.text
+    'Hello there'
+
+    Reads are recorded on the instance itself, so properties, isinstance
+    and super() behave as usual:
+
+    >>> class Square(Rectangle):
+    ...     def __init__(self, side):
+    ...         super(Square, self).__init__(side, side)
+    ...
+    ...     @property
+    ...     def side(self):
+    ...         return self.width
+    ...
+    ...     @tracked_cached
+    ...     def label(self):
+    ...         print "Computing label"
+    ...         return '%s %s' % (isinstance(self, Square), self.side)
+    ...
+    >>> s = Square(3)
+    >>> s.label
+    Computing label
+    'True 3'
+    >>> s.width = 5
+    >>> s.label
+    Computing label
+    'True 5'
+
+    Assignments reach the class's descriptors however they are made:
+
+    >>> class Direct(Rectangle):
+    ...     def __setattr__(self, name, value):
+    ...         object.__setattr__(self, name, value)
+    ...
+    >>> d = Direct(2, 3)
+    >>> d.area
+    Computing area
+    6
+    >>> d.width = 10
+    >>> d.area
+    Computing area
+    30
+
+    Classes without a __dict__ cannot have tracked_cached values:
+
+    >>> from bwobject import BWObjectMeta
+    >>> class Point(object):
+    ...     __metaclass__ = BWObjectMeta
+    ...     __slots__ = ('x',)
+    ...
+    ...     @tracked_cached
+    ...     def norm(self):
+    ...         return abs(self.x)
+    ...
+    Traceback (most recent call last):
+        ...
+    TypeError: 'Point' needs a __dict__ for tracked_cached values
+    '''
 
+    return TrackedCached(fn)
+tracked_cached.volatile = Volatile
@@ -114,6 +114,16 @@ Traceback (most recent call last):
     ...
 KeyError: 'user'
 
+Unbound references are interned, and references keep the ones made by
+attribute access on them, so repeated lookups through the same attributes
+reuse the same reference objects and path strings:
+
+>>> BWContext['user.roles'] is roles is BWContext.user.roles
+True
+>>> bound_user = rootctx.user
+>>> bound_user.roles is bound_user.roles
+True
+
 Only contexts may be dereferenced in this way:
 
 >>> +([]/user)
@@ -290,6 +300,20 @@ class property:
 >>> +BWContext.CURRENT().user
 User(roles=('hero', 'flying'), username='superman')
 
+Finding CURRENT walks the stack of frames.  Context classes with
+use_stack set (see bwthrowable) keep a per-thread index of the frames
+contexts are thrown to, so the walk only compares frames:
+
+>>> class RequestContext(BWContext):
+...     use_stack = True
+...
+>>> def handle():
+...     RequestContext('request', path='/').throw()
+...     return +RequestContext.CURRENT.path
+...
+>>> handle()
+'/'
+
 ========================
 === Deep Definitions ===
 ========================
@@ -328,6 +352,12 @@ Partial keys is a way of placign a context inside of another:
 >>> mainctx.sub.hello
 <main/sub.hello => 'world'>
 
+The longest partial key matching a key is used:
+
+>>> mainctx['sub.deeper.'] = 'deep'
+>>> mainctx.sub.hello, mainctx.sub.deeper.hello
+(<main/sub.hello => 'world'>, <main/sub.deeper.hello => 'deep'>)
+
 ==========================
 === Deleting Variables ===
 ==========================
@@ -519,23 +549,556 @@ False
 >>> sub.abc
 <test{1}/abc => 'abc, rev 1'>
 
+====================
+=== Lookup index ===
+====================
+
+Since the contexts a context is based on are only ever seen through such
+snapshots, deeply nested contexts keep an _index of the keys found in
+their bases past the first, mapping each key to the getter that answers
+it.  A lookup missing the context's own storage and its first base is
+then a single dictionary hit instead of a walk of every base's getter.
+The index is built once per base and shared by all of its subcontexts:
+
+>>> first, second = BWContext(ctx), BWContext(ctx)
+>>> first.abc, second.abc
+(<test{1}/abc => 'abc, rev 2'>, <test{1}/abc => 'abc, rev 2'>)
+>>> first._index is second._index
+True
+>>> deep = BWContext(BWContext(BWContext(first, xyz='xyz')))
+>>> sorted(deep._index)
+['abc', 'xyz']
+
+Keys that a partial key or a custom _getter of a base may answer first are
+left out of the index and found by walking the getters as before.
+
+Keys found in none of several bases are remembered as well (up to
+MISSES_LIMIT of them), so that repeatedly looking up a missing key, as with
+the - and ~ operators, only checks the context's own storage:
+
+>>> -deep.feature_flag, -second.feature_flag
+(None, None)
+>>> 'feature_flag' in deep._misses
+True
+>>> deep.feature_flag = True
+>>> -deep.feature_flag, -second.feature_flag
+(True, None)
+
+=====================
+=== Storage Types ===
+=====================
+
+Writing to a context that has been referenced copies its storage (see
+above), which costs time proportional to its size.  Context classes can
+set _storage_type to BWHamt instead, whose copies take constant time and
+whose writes after a copy only copy the changed path:
+
+>>> class LargeContext(BWContext):
+...     _storage_type = BWHamt
+...
+>>> big = LargeContext('big', **dict(('key%d' % i, i) for i in range(1000)))
+>>> request = big(key5='five')
+>>> big.key6 = 'six'
+>>> request.key5, request.key6, big.key5, big.key6
+(<big{1}/key5 => 'five'>, <big{1}/key6 => 6>, <big/key5 => 5>, <big/key6 => 'six'>)
+>>> isinstance(big._storage, BWHamt)
+True
+
 '''
 
 from __version__ import *
 from bwthrowable import BWThrowable
 from bwcached import cached
 from bwobject import BWObject
-import sys, traceback
+from collections import OrderedDict
+import sys, traceback, types, itertools, weakref, threading
 
 NOT_FOUND = type(None)
 DELETED = KeyError
 
+class HamtNode(object):
+    __slots__ = ('bitmap', 'array', 'edit')
+
+    def __init__(self, bitmap, array, edit):
+        self.bitmap = bitmap
+        self.array = array
+        self.edit = edit
+
+class HamtCollision(object):
+    __slots__ = ('hash', 'array', 'edit')
+
+    def __init__(self, hash, array, edit):
+        self.hash = hash
+        self.array = array
+        self.edit = edit
+
+# Marks the array slots of HamtNodes holding child nodes.
+SUBNODE = HamtNode
+
+def hamt_find(node, h, key, default, HamtCollision=HamtCollision,
+              SUBNODE=SUBNODE):
+    shift = 0
+    while type(node) is not HamtCollision:
+        bit = 1 << ((h >> shift) & 31)
+        bitmap = node.bitmap
+        if not bitmap & bit:
+            return default
+        i = 2 * bin(bitmap & (bit - 1)).count('1')
+        k = node.array[i]
+        if k is SUBNODE:
+            node = node.array[i + 1]
+            shift += 5
+        elif k is key or k == key:
+            return node.array[i + 1]
+        else:
+            return default
+    array = node.array
+    for i in xrange(0, len(array), 2):
+        if array[i] == key:
+            return array[i + 1]
+    return default
+
+def hamt_assoc(node, edit, shift, h, key, value, SUBNODE=SUBNODE):
+    '''
+    Returns node with key set to value and whether key was added, changing
+    node in place if it was created with edit or a copy of it otherwise.
+    '''
+
+    if type(node) is HamtCollision:
+        if node.hash != h:
+            node = HamtNode(1 << ((node.hash >> shift) & 31),
+                            [SUBNODE, node], edit)
+            return hamt_assoc(node, edit, shift, h, key, value)
+        array = node.array
+        if node.edit is not edit:
+            array = list(array)
+            node = HamtCollision(h, array, edit)
+        for i in xrange(0, len(array), 2):
+            if array[i] == key:
+                array[i + 1] = value
+                return node, False
+        array.extend((key, value))
+        return node, True
+    bit = 1 << ((h >> shift) & 31)
+    i = 2 * bin(node.bitmap & (bit - 1)).count('1')
+    if node.edit is not edit:
+        node = HamtNode(node.bitmap, list(node.array), edit)
+    array = node.array
+    if not node.bitmap & bit:
+        node.bitmap |= bit
+        array[i:i] = (key, value)
+        return node, True
+    k = array[i]
+    if k is SUBNODE:
+        array[i + 1], added = hamt_assoc(array[i + 1], edit, shift + 5,
+                                         h, key, value)
+        return node, added
+    if k is key or k == key:
+        array[i + 1] = value
+        return node, False
+    other = hash(k)
+    if other == h:
+        child = HamtCollision(h, [k, array[i + 1], key, value], edit)
+    else:
+        child = HamtNode(0, [], edit)
+        child = hamt_assoc(child, edit, shift + 5, other, k, array[i + 1])[0]
+        child = hamt_assoc(child, edit, shift + 5, h, key, value)[0]
+    array[i:i + 2] = (SUBNODE, child)
+    return node, True
+
+def hamt_items(node, SUBNODE=SUBNODE):
+    array = node.array
+    for i in xrange(0, len(array), 2):
+        if type(node) is HamtNode and array[i] is SUBNODE:
+            for item in hamt_items(array[i + 1]):
+                yield item
+        else:
+            yield array[i], array[i + 1]
+
+class BWHamt(object):
+    '''
+    A hash array mapped trie providing the mapping methods contexts use on
+    their storage (see BWContext._storage_type).  Copies take constant
+    time by sharing the trie; afterwards, each copy copies the nodes on
+    the path to a key on its first write to them, taking time
+    proportional to the trie depth (logarithmic in the number of keys)
+    rather than to the number of keys.
+
+    >>> a = BWHamt((i, i) for i in range(1000))
+    >>> b = a.copy()
+    >>> b[5] = 'five'
+    >>> b['new'] = True
+    >>> a[5], b[5], len(a), len(b), 'new' in a, b.get('new')
+    (5, 'five', 1000, 1001, False, True)
+    >>> sorted(a) == range(1000)
+    True
+
+    Keys cannot be removed, as contexts mask deleted keys instead.
+    '''
+
+    __slots__ = ('root', 'size', 'edit')
+
+    def __init__(self, items=()):
+        self.root = HamtNode(0, [], None)
+        self.size = 0
+        self.edit = object()
+        if items:
+            self.update(items)
+
+    def get(self, key, default=None):
+        return hamt_find(self.root, hash(key), key, default)
+
+    def __getitem__(self, key, NOT_FOUND=NOT_FOUND):
+        value = hamt_find(self.root, hash(key), key, NOT_FOUND)
+        if value is NOT_FOUND:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key, NOT_FOUND=NOT_FOUND):
+        return hamt_find(self.root, hash(key), key, NOT_FOUND) is not NOT_FOUND
+
+    def __setitem__(self, key, value):
+        self.root, added = hamt_assoc(self.root, self.edit, 0, hash(key),
+                                      key, value)
+        self.size += added
+
+    def update(self, items):
+        if hasattr(items, 'iteritems'):
+            items = items.iteritems()
+        for key, value in items:
+            self[key] = value
+
+    def copy(self):
+        other = type(self)()
+        other.root = self.root
+        other.size = self.size
+        # Neither copy may now change the shared nodes in place.
+        self.edit = object()
+        return other
+
+    def __len__(self):
+        return self.size
+
+    def iteritems(self):
+        return hamt_items(self.root)
+
+    def keys(self):
+        return list(self)
+
+    def __iter__(self):
+        for key, value in hamt_items(self.root):
+            yield key
+
+    def __repr__(self):
+        return 'BWHamt(%r)' % (dict(self.iteritems()),)
+
+class BWPrefixTrie(object):
+    '''
+    An immutable set of partial keys (ending in '.') and their values,
+    stored as a trie of their '.'-separated segments.  Finding the longest
+    partial key of a key takes time proportional to the key's depth rather
+    than the number of partial keys.  Adding keys returns a new trie
+    sharing all but the changed path with the original.
+
+    >>> trie = BWPrefixTrie().add('svc.', 1).add('svc.foo.', 2)
+    >>> trie.find('svc.foo.bar'), trie.find('svc.other'), trie.find('svc')
+    ((2, 'bar'), (1, 'other'), None)
+    >>> len(trie), list(trie)
+    (2, [('svc.', 1), ('svc.foo.', 2)])
+    '''
+
+    __slots__ = ('root', 'size')
+
+    def __init__(self, root=None, size=0):
+        self.root = {} if root is None else root
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            for part, child in sorted(node.iteritems(), reverse=True):
+                if part is None:
+                    yield child
+                else:
+                    nodes.append(child)
+
+    def add(self, prefix, value):
+        parts = prefix.split('.')[:-1]
+        root = node = dict(self.root)
+        for part in parts:
+            node[part] = node = dict(node.get(part, ()))
+        size = self.size + (None not in node)
+        node[None] = (prefix, value)
+        return type(self)(root, size)
+
+    def update(self, other):
+        builder = BWPrefixTrieBuilder(self)
+        for prefix, value in other:
+            builder.add(prefix, value)
+        return builder.trie()
+
+    def get(self, prefix, default=None):
+        node = self.root
+        for part in prefix.split('.')[:-1]:
+            node = node.get(part)
+            if node is None:
+                return default
+        return node.get(None, (None, default))[1]
+
+    def find(self, key):
+        '''
+        Returns the value of the longest partial key of key and the rest
+        of key following it, or None if there is none.
+        '''
+
+        node = self.root
+        found = None
+        for part in key.split('.')[:-1]:
+            node = node.get(part)
+            if node is None:
+                break
+            found = node.get(None, found)
+        if found is None:
+            return None
+        prefix, value = found
+        return value, key[len(prefix):]
+
+NO_PREFIXES = BWPrefixTrie()
+
+class BWPrefixTrieBuilder(object):
+    '''
+    Adds many partial keys to a BWPrefixTrie, changing its own copies of
+    the trie's nodes in place so that each node is copied once rather than
+    on every add.  trie() returns the result, after which adds copy again.
+
+    >>> base = BWPrefixTrie().add('svc.', 1)
+    >>> builder = BWPrefixTrieBuilder(base)
+    >>> for i in range(3):
+    ...     _ = builder.add('svc.n%d.' % i, i)
+    ...
+    >>> trie = builder.trie()
+    >>> len(trie), trie.find('svc.n2.x'), len(base)
+    (4, (2, 'x'), 1)
+    '''
+
+    __slots__ = ('type', 'root', 'size', 'owned')
+
+    def __init__(self, trie):
+        self.type = type(trie)
+        self.root = trie.root
+        self.size = trie.size
+        self.owned = set()
+
+    def add(self, prefix, value):
+        owned = self.owned
+        node = self.root
+        if id(node) not in owned:
+            node = self.root = dict(node)
+            owned.add(id(node))
+        for part in prefix.split('.')[:-1]:
+            child = node.get(part)
+            if child is None or id(child) not in owned:
+                child = node[part] = dict(child or ())
+                owned.add(id(child))
+            node = child
+        self.size += None not in node
+        node[None] = (prefix, value)
+        return self
+
+    def trie(self):
+        self.owned = set()
+        return self.type(self.root, self.size)
+
+class BWInstallStorage(dict):
+    '''
+    Storage of the temporary contexts objects are installed in (see
+    BWContext.update), recording the keys written to it.
+    '''
+
+    __slots__ = ('written',)
+
+    def __init__(self, *_args, **_kw):
+        dict.__init__(self, *_args, **_kw)
+        self.written = []
+
+    def __setitem__(self, key, value):
+        self.written.append(key)
+        dict.__setitem__(self, key, value)
+
+    def update(self, other):
+        if not hasattr(other, 'keys'):
+            other = dict(other)
+        self.written.extend(other.keys())
+        dict.update(self, other)
+
+    def copy(self):
+        other = type(self)(self)
+        other.written = self.written
+        return other
+
+def getter_prefixes(getter, GET_TYPES=(types.BuiltinMethodType,
+                                        types.MethodType)):
+    '''
+    Returns the partial keys that a getter (see BWContext._getter) answers
+    beyond the keys of its dictionary, or None if it may answer any key.
+    '''
+
+    if type(getter) in GET_TYPES and getter.__name__ == 'get':
+        return NO_PREFIXES
+    return getattr(getter, '__varkeys__', None)
+
+def index_getters(getters, index=None):
+    '''
+    Returns a dictionary mapping keys to the first of getters answering
+    them, leaving out keys an earlier getter may answer by partial key.
+    Getters following one that may answer any key are not indexed.  If
+    given, index is the index of the getters following getters.
+    '''
+
+    result = {}
+    tries = []
+    def shadowed(key):
+        return isinstance(key, basestring) and any(
+            trie.find(key) is not None for trie in tries)
+    for getter in getters:
+        own = getter_prefixes(getter)
+        if own is None:
+            return result
+        for key in getter.__self__:
+            if key not in result and not (tries and shadowed(key)):
+                result[key] = getter
+        if own:
+            tries.append(own)
+    if index:
+        for key, getter in index.iteritems():
+            if key not in result and not (tries and shadowed(key)):
+                result[key] = getter
+    return result
+
+# The most paths and unbound references interned before starting over.
+INTERN_LIMIT = 4096
+
+# The most attributes a reference keeps before it stops caching the
+# references made by attribute access on it.
+REFS_LIMIT = 256
+
+# Interned paths of attribute references, by parent path and name.
+PATHS = {}
+
+def join_path(path, name, PATHS=PATHS, INTERN_LIMIT=INTERN_LIMIT):
+    '''
+    Returns the interned path of attribute name below path, or of the
+    top-level name if path is None.
+    '''
+
+    try:
+        return PATHS[path, name]
+    except KeyError:
+        if path is None:
+            child = intern(name.replace('__', '.'))
+        else:
+            child = intern(path + '.' + name.replace('__', '_'))
+        if len(PATHS) >= INTERN_LIMIT:
+            PATHS.clear()
+        PATHS[path, name] = child
+        return child
+
+# Unbound references, by context class and path.
+UNBOUND_REFS = {}
+
+def unbound_ref(ctxtype, path, UNBOUND_REFS=UNBOUND_REFS,
+                INTERN_LIMIT=INTERN_LIMIT):
+    try:
+        return UNBOUND_REFS[ctxtype, path]
+    except KeyError:
+        if len(UNBOUND_REFS) >= INTERN_LIMIT:
+            UNBOUND_REFS.clear()
+        ref = UNBOUND_REFS[ctxtype, path] = BWUnboundContextRef(ctxtype, path)
+        return ref
+
+# The most keys remembered as missing from the bases of a context.
+MISSES_LIMIT = 1024
+
+def new_misses(getters):
+    '''
+    Returns a set to remember the keys none of getters has in, or None if
+    a getter may answer any key (so misses cannot be remembered).
+    '''
+
+    if not getters:
+        return None
+    for getter in getters:
+        if getter_prefixes(getter) is None:
+            return None
+    return set()
+
+def note_miss(misses, getters, key, MISSES_LIMIT=MISSES_LIMIT):
+    '''
+    Remembers that key is in none of getters, unless one holds it (with a
+    dynamic value that did not apply).
+    '''
+
+    for getter in getters:
+        if key in getter.__self__:
+            return
+        prefixes = getter_prefixes(getter)
+        if (prefixes and isinstance(key, basestring) and
+            prefixes.find(key) is not None):
+            return
+    if len(misses) >= MISSES_LIMIT:
+        misses.clear()
+    misses.add(key)
+
+def weak_callback(fn):
+    '''
+    Returns a function returning fn.  Bound methods are only held through
+    a weak reference to their instance (so the function returns None once
+    it is gone); anything else is held as is.
+    '''
+
+    obj = getattr(fn, '__self__', None)
+    if obj is None:
+        return lambda: fn
+    obj = weakref.ref(obj)
+    func = fn.__func__
+    def callback():
+        instance = obj()
+        if instance is not None:
+            return types.MethodType(func, instance)
+    callback.__func__ = func
+    callback.__instance__ = obj
+    return callback
+
+def watched_keys(watchers, key):
+    '''
+    Yields the keys of watchers that a change of key is notified to: key
+    itself and each of its prefixes ending with a '.'.
+    '''
+
+    if key in watchers:
+        yield key
+    if isinstance(key, basestring):
+        end = key.find('.')
+        while 0 <= end < len(key) - 1:
+            prefix = key[:end + 1]
+            if prefix in watchers:
+                yield prefix
+            end = key.find('.', end + 1)
+
+# Contexts with more getters than this in their bases (see BWContext._bro)
+# look up inherited keys through an index of all but the first.
+INDEX_DEPTH = 4
+
 class BWContextMeta(getattr(BWThrowable, '__metaclass__', type)):
     def __getattr__(cls, name):
-        return BWUnboundContextRef(cls, name.replace('__', '_'))
+        return unbound_ref(cls, intern(name.replace('__', '_')))
 
     def __getitem__(cls, key):
-        return BWUnboundContextRef(cls, key)
+        return unbound_ref(cls, key)
 
     @property
     def CURRENT(cls):
@@ -543,7 +1106,8 @@ class BWContextMeta(getattr(BWThrowable, '__metaclass__', type)):
 
 class BWContext(BWThrowable):
     __metaclass__ = BWContextMeta
-    _varkeys = ()
+    _varkeys = NO_PREFIXES
+    _storage_type = dict
 
     def __init__(_self, _name=None, *_basectx, **_kw):
         if isinstance(_name, basestring):
@@ -555,10 +1119,8 @@ class BWContext(BWThrowable):
         if not _basectx and _self.__dict__.get('_name') is None:
             raise TypeError('name must be specified for root contexts')
         if _kw:
-            for key, value in _kw.iteritems():
-                # Init arguments must be strings or Python raises a
-                # TypeError.
-                _self[key.replace('__', '.')] = value
+            # Init arguments must be strings or Python raises a TypeError.
+            _self.update(**_kw)
 
     def __call__(_self, _name=None, *_others, **_kw):
         return type(_self)(_name, _self, *_others, **_kw)
@@ -596,10 +1158,11 @@ class BWContext(BWThrowable):
         ref = self.__dict__.pop('_ref', None)
         self.__dict__.pop('_getters', None)
         if ref is None:
-            return {}
+            return self._storage_type()
         else:
             self.__dict__.pop('_ref_getfn', None)
-            return dict(ref)
+            self.__dict__.pop('_refmisses', None)
+            return ref.copy()
 
     @cached
     def _storage_getfn(self):
@@ -607,7 +1170,7 @@ class BWContext(BWThrowable):
         fn = self._getter(storage)
         if not hasattr(fn, '__self__'):
             fn.__self__ = storage
-        elif not isinstance(fn.__self__, dict):
+        elif not isinstance(fn.__self__, (dict, self._storage_type)):
             raise TypeError('_getter function\'s __self__ must be a dict')
         return fn
 
@@ -616,7 +1179,7 @@ class BWContext(BWThrowable):
         storage = self.__dict__.pop('_storage', None)
         self.__dict__.pop('_getters', None)
         if storage is None:
-            return {}
+            return self._storage_type()
         else:
             self.__dict__.pop('_storage_getfn', None)
             return storage
@@ -627,7 +1190,7 @@ class BWContext(BWThrowable):
         fn = self._getter(ref)
         if not hasattr(fn, '__self__'):
             fn.__self__ = ref
-        elif not isinstance(fn.__self__, dict):
+        elif not isinstance(fn.__self__, (dict, self._storage_type)):
             raise TypeError('_getter function\'s __self__ must be a dict')
         return fn
 
@@ -639,15 +1202,13 @@ class BWContext(BWThrowable):
                 obj = storage.get(key, NOT_FOUND)
                 subkey = None
                 if obj is NOT_FOUND and isinstance(key, basestring):
-                    # We've already tested for at least one varkey.
-                    for prefix, value in varkeys: # pragma: no partial
-                        if key.startswith(prefix):
-                            obj = value
-                            subkey = key[len(prefix):]
-                            break
-                    else:
+                    found = varkeys.find(key)
+                    if found is None:
                         obj = default
+                    else:
+                        obj, subkey = found
                 return self._getprop(obj, default, subkey)
+            getter.__varkeys__ = varkeys
             return getter
         else:
             return storage.get
@@ -692,23 +1253,150 @@ class BWContext(BWThrowable):
                     found.add(id(getter))
             return tuple(ctx)
 
+    @cached
+    def _index(self):
+        bases = self._basectx
+        if len(bases) == 1:
+            return bases[0]._broindex
+        return index_getters(self._bro[1:])
+
+    @cached
+    def _broindex(self):
+        return index_getters(self._bro[:1], self._index)
+
+    @cached
+    def _misses(self):
+        bases = self._basectx
+        if (len(bases) == 1 and
+            bases[0].__dict__.get('_ref_getfn') is self._bro[0]):
+            return bases[0]._refmisses
+        return new_misses(self._bro)
+
+    @cached
+    def _refmisses(self):
+        return new_misses((self._ref_getfn,) + self._bro)
+
     def get(self, key, default=None, NOT_FOUND=NOT_FOUND, DELETED=DELETED):
-        # This will always have at least one getter.
-        for getter in self._getters:    # pragma: no partial
+        obj = self._getters[0](key, NOT_FOUND)
+        if obj is NOT_FOUND:
+            bro = self._bro
+            if len(bro) == 1:
+                obj = bro[0](key, NOT_FOUND)
+                if obj is NOT_FOUND:
+                    obj = default
+            elif bro:
+                obj = self._get_inherited(key, default, bro)
+            else:
+                obj = default
+        if obj is DELETED:
+            obj = default
+        return self._getprop(obj, default)
+
+    def _get_inherited(self, key, default, bro, NOT_FOUND=NOT_FOUND,
+                             INDEX_DEPTH=INDEX_DEPTH):
+        '''
+        Returns the value of key in the bases (bro), through the index of
+        all but the first getter if there are many, and remembering keys
+        found in none of them (see _misses).
+        '''
+
+        misses = self._misses
+        if misses and key in misses:
+            return default
+        if len(bro) > INDEX_DEPTH:
+            obj = bro[0](key, NOT_FOUND)
+            if obj is not NOT_FOUND:
+                return obj
+            getter = self._index.get(key)
+            if getter is not None:
+                obj = getter(key, NOT_FOUND)
+                if obj is not NOT_FOUND:
+                    return obj
+        for getter in bro:
             obj = getter(key, NOT_FOUND)
             if obj is not NOT_FOUND:
+                return obj
+        if misses is not None:
+            note_miss(misses, bro, key)
+        return default
+
+    def get_many(self, keys, default=None, NOT_FOUND=NOT_FOUND,
+                       DELETED=DELETED):
+        '''
+        Returns a tuple of the values of keys (or default for those not
+        found), as get() would, walking the getters once for all of them.
+
+        >>> base = BWContext('base', a=1, b__c=2)
+        >>> ctx = base(d=4)
+        >>> ctx.get_many(['a', 'b.c', 'd', 'e'], 0)
+        (1, 2, 4, 0)
+        '''
+
+        keys = tuple(keys)
+        found = {}
+        pending = set(keys)
+        getters = self._getters
+        misses = self._misses
+        for getter in getters:
+            remaining = []
+            for key in pending:
+                obj = getter(key, NOT_FOUND)
+                if obj is NOT_FOUND:
+                    remaining.append(key)
+                else:
+                    found[key] = obj
+            if not remaining:
                 break
+            if misses is not None and getter is getters[0]:
+                remaining = [key for key in remaining if key not in misses]
+            pending = remaining
         else:
-            obj = default
-        if obj is DELETED:
-            obj = default
-        return self._getprop(obj, default)
+            if misses is not None and len(getters) > 1:
+                for key in pending:
+                    note_miss(misses, getters[1:], key)
+        values = []
+        for key in keys:
+            obj = found.get(key, default)
+            if obj is DELETED:
+                obj = default
+            if hasattr(obj, '__ctxproperty__'):
+                obj = self._getprop(obj, default)
+            values.append(obj)
+        return tuple(values)
+
+    def extract(self, *keys):
+        '''
+        Returns a dictionary of the values of keys (None if not found).
+
+        >>> BWContext('test', a=1, b__c=2).extract('a', 'b.c', 'd')
+        {'a': 1, 'b.c': 2, 'd': None}
+        '''
+
+        return dict(zip(keys, self.get_many(keys)))
+
+    def aget(self, key, default=None):
+        '''
+        Looks up key on a background thread (see aget_pool), returning a
+        BWFuture whose get() waits for the value.  Lookups of lazy values
+        (see lazy) that are still being computed do not hold a thread
+        while waiting for that computation, but start over once it is
+        done.
+
+        >>> ctx = BWContext('test-aget', a=1)
+        >>> ctx.aget('a').get(), ctx.aget('b', 2).get()
+        (1, 2)
+        '''
+
+        future = BWFuture()
+        aget_pool().apply_async(background_get, (self, key, default, future))
+        return future
 
     def __getattr__(self, name, NOT_FOUND=NOT_FOUND):
         if name.startswith('_'):
             raise AttributeError(name)
         else:
-            return BWBoundContextRef(self, name.replace('__', '.'))
+            # Keeping the reference would have the context refer to itself.
+            return BWBoundContextRef(self, join_path(None, name))
 
     def __setattr__(self, name, value):
         self[name.replace('__', '.')] = value
@@ -719,49 +1407,282 @@ class BWContext(BWThrowable):
     def __getitem__(self, key, NOT_FOUND=NOT_FOUND):
         return BWBoundContextRef(self, key.replace('__', '.'))
 
-    def __setitem__(self, key, value, NOT_FOUND=NOT_FOUND):
+    def __setitem__(self, key, value):
+        if (getattr(value, '__installctx__', None) is not None or
+            isinstance(key, basestring) and key.endswith('.')):
+            self.update(((key, value),))
+            return
+        # A plain key (the usual case) needs none of update's bookkeeping.
         uninstall = self.get((key, '__uninstall__'), None)
         if uninstall is not None:
             self._storage.update(uninstall)
+        self._storage[key] = value
+        if self.__dict__.get('_watchers'):
+            self._notify(list(uninstall or ()) + [key])
 
-        fn = getattr(value, '__installctx__', None)
-        if (fn is not None and
-            self.get(('__installed__', key, id(value))) is None):
-
-            del self[key]
-            install_ctx = self()
-            install_ctx._storage['__installed__', key, id(value)] = True
-            fn(install_ctx[key])
-            uninstall = {}
-            for ikey in install_ctx._ref:
-                uninstall[ikey] = self.get(ikey, DELETED)
-            self._storage.update(install_ctx._ref)
-            if install_ctx._varkeys:
-                self.__dict__['_varkeys'] = \
-                    (self._varkeys + install_ctx._varkeys)
-            self._storage[key, '__uninstall__'] = uninstall
-            self.__dict__.pop('_storage_getfn', None)
-            self.__dict__.pop('_getters', None)
+    def update(self, items=(), **_kw):
+        '''
+        Sets each key and value of a mapping or sequence of pairs, followed
+        by any keyword arguments (with double-underscores as '.'), as
+        setting them one by one would.  The getters are only rebuilt once
+        and consecutive installable objects share a temporary context (see
+        Installing Objects).
+
+        >>> ctx = BWContext('test-update')
+        >>> ctx.update([('a', 1), ('svc.', 'prefix')], b__c=2)
+        >>> ctx.a, ctx.b.c, ctx.svc.anything
+        (<test-update/a => 1>, <test-update/b.c => 2>, <test-update/svc.anything => 'prefix'>)
+
+        Installers see the keys set before them in the batch:
+
+        >>> class Reader(BWContextInstallable):
+        ...     def ctx_install(self, ctx):
+        ...         found = ctx.context.get('first')
+        ...         ctx.seen = (ctx.context.get('cfg'), type(found).__name__)
+        ...
+        >>> ctx = BWContext('test-update-install')
+        >>> ctx.update([('first', Reader()), ('cfg', 5), ('svc', Reader())])
+        >>> -ctx.first.seen, -ctx.svc.seen
+        ((None, 'NoneType'), (5, 'Reader'))
+        '''
 
-        if isinstance(key, basestring) and key.endswith('.'):
-            self.__dict__['_varkeys'] = self._varkeys + ((key, value),)
-            self._storage[key[:-1]] = value
-            self.__dict__.pop('_storage_getfn', None)
-            self.__dict__.pop('_getters', None)
-        else:
-            self._storage[key] = value
+        if hasattr(items, 'iteritems'):
+            items = items.iteritems()
+        if _kw:
+            items = itertools.chain(items, (
+                (key.replace('__', '.'), value)
+                for key, value in _kw.iteritems()))
+        install_ctx = install_storage = None
+        varkeys = self._varkeys
+        builder = None
+        watchers = self.__dict__.get('_watchers')
+        changed = [] if watchers else None
+        for key, value in items:
+            uninstall = self.get((key, '__uninstall__'), None)
+            if uninstall is not None:
+                self._storage.update(uninstall)
+                install_ctx = None
+                if changed is not None:
+                    changed.extend(uninstall)
+
+            fn = getattr(value, '__installctx__', None)
+            installing = (fn is not None and
+                self.get(('__installed__', key, id(value))) is None)
+            if installing:
+                self._storage[key] = DELETED
+                if builder is not None:
+                    varkeys = builder.trie()
+                    builder = None
+                if varkeys is not self._varkeys:
+                    self._set_varkeys(varkeys)
+                # The install context is shared by the installers of the
+                # batch while it sees every key written to this context
+                # (it is a snapshot once referenced by a subcontext).
+                if (install_ctx is None or
+                    install_ctx.__dict__.get('_storage') is not
+                    install_storage):
+                    install_ctx = self()
+                    install_storage = BWInstallStorage()
+                    install_ctx.__dict__['_storage'] = install_storage
+                else:
+                    install_storage[key] = DELETED
+                varkeys = self._install(install_ctx, key, value, fn,
+                                        changed)
+
+            if isinstance(key, basestring) and key.endswith('.'):
+                if builder is None:
+                    builder = BWPrefixTrieBuilder(varkeys)
+                builder.add(key, value)
+                self._storage[key[:-1]] = value
+                install_ctx = None
+            else:
+                self._storage[key] = value
+                if (installing and install_ctx.__dict__.get('_storage') is
+                    install_storage):
+                    install_storage[key] = value
+                else:
+                    install_ctx = None
+            if changed is not None:
+                changed.append(key)
+        if builder is not None:
+            varkeys = builder.trie()
+        if varkeys is not self._varkeys:
+            self._set_varkeys(varkeys)
+        if changed:
+            self._notify(changed)
+
+    def install_many(self, items=(), **_kw):
+        '''
+        Installs many objects at once (see update), requiring each value to
+        be installable.
+
+        >>> class Marker(BWContextInstallable):
+        ...     def ctx_install(self, ctx):
+        ...         ctx.installed = True
+        ...
+        >>> ctx = BWContext('test-install-many')
+        >>> ctx.install_many(first=Marker(), second=Marker())
+        >>> ctx.first.installed, ctx.second.installed
+        (<test-install-many/first.installed => True>, <test-install-many/second.installed => True>)
+        >>> ctx.install_many(third=None)
+        Traceback (most recent call last):
+            ...
+        TypeError: Cannot install None at 'third'
+        '''
+
+        if hasattr(items, 'iteritems'):
+            items = items.iteritems()
+        items = list(itertools.chain(items, (
+            (key.replace('__', '.'), value)
+            for key, value in _kw.iteritems())))
+        for key, value in items:
+            if getattr(value, '__installctx__', None) is None:
+                raise TypeError('Cannot install %r at %r' % (value, key))
+        self.update(items)
+
+    def _install(self, install_ctx, key, value, fn, changed=None):
+        '''
+        Installs value at key through install_ctx, copying the variables it
+        sets into this context (adding their keys to changed, if given) and
+        recording their previous values for uninstallation.  Returns the
+        partial keys of this context.
+        '''
+
+        storage = install_ctx.__dict__.get('_storage')
+        if storage is None:
+            storage = install_ctx._storage
+        written = storage.written
+        start = len(written)
+        storage['__installed__', key, id(value)] = True
+        fn(install_ctx[key])
+        own = install_ctx.__dict__.get('_storage')
+        if own is None:
+            own = install_ctx._ref
+        ikeys = set(written[start:])
+        uninstall = {}
+        for ikey in ikeys:
+            uninstall[ikey] = self.get(ikey, DELETED)
+        varkeys = self._varkeys
+        ivarkeys = install_ctx._varkeys
+        storage = self._storage
+        added = []
+        for ikey in ikeys:
+            storage[ikey] = own[ikey]
+            if ivarkeys and isinstance(ikey, basestring):
+                prefix = ikey + '.'
+                ivalue = ivarkeys.get(prefix, NOT_FOUND)
+                if ivalue is not NOT_FOUND:
+                    added.append((prefix, ivalue))
+        if added:
+            varkeys = varkeys.update(added)
+        storage[key, '__uninstall__'] = uninstall
+        if changed is not None:
+            changed.extend(ikeys)
+        if varkeys is not self._varkeys:
+            self._set_varkeys(varkeys)
+        return varkeys
+
+    def _set_varkeys(self, varkeys):
+        self.__dict__['_varkeys'] = varkeys
+        self.__dict__.pop('_storage_getfn', None)
+        self.__dict__.pop('_getters', None)
 
     def __delitem__(self, key):
         uninstall = self.get((key, '__uninstall__'), None)
         if uninstall:
             self._storage.update(uninstall)
         self._storage[key] = DELETED
+        if self.__dict__.get('_watchers'):
+            self._notify(list(uninstall or ()) + [key])
+
+    def watch(self, key, callback=None):
+        '''
+        Calls callback(ctx, key) after key, or any key starting with key if
+        it ends with a '.', is set or deleted in this context.  Bound
+        methods are only weakly referenced through their instance, so
+        watching does not keep objects alive; other callbacks are kept until
+        unwatched.  Without a callback, returns a decorator.
+
+        >>> ctx = BWContext('test-watch', cfg__timeout=5)
+        >>> seen = []
+        >>> @ctx.watch('cfg.')
+        ... def changed(ctx, key):
+        ...     seen.append((key, -ctx[key]))
+        ...
+        >>> ctx.cfg.timeout = 10
+        >>> ctx.update(cfg__retries=3, other=1)
+        >>> del ctx.cfg.timeout
+        >>> seen
+        [('cfg.timeout', 10), ('cfg.retries', 3), ('cfg.timeout', None)]
+        >>> ctx.unwatch('cfg.', changed)
+        >>> ctx.cfg.timeout = 1
+        >>> len(seen)
+        3
+
+        Subcontexts keep the values their bases had when they were created
+        (see Storage Types), so changes are only notified by the context
+        they are made in:
+
+        >>> sub = ctx(name='sub')
+        >>> _ = sub.watch('cfg.timeout', changed)
+        >>> ctx.cfg.timeout = 2
+        >>> -sub.cfg.timeout, len(seen)
+        (1, 3)
+
+        Callbacks only referenced by the context still get called:
+
+        >>> _ = ctx.watch('debug', lambda ctx, key: seen.append(key))
+        >>> ctx.debug = True
+        >>> seen[-1]
+        'debug'
+        '''
+
+        if callback is None:
+            return lambda callback: self.watch(key, callback)
+        watchers = self.__dict__.get('_watchers')
+        if watchers is None:
+            watchers = self.__dict__['_watchers'] = {}
+        watchers.setdefault(key, []).append(weak_callback(callback))
+        return callback
+
+    def unwatch(self, key, callback):
+        '''
+        Stops calling callback for changes of key (see watch).
+        '''
+
+        watchers = self.__dict__.get('_watchers', {})
+        refs = [ref for ref in watchers.get(key, ()) if ref() != callback]
+        if refs:
+            watchers[key] = refs
+        else:
+            watchers.pop(key, None)
+
+    def _notify(self, keys):
+        watchers = self._watchers
+        seen = set()
+        for key in keys:
+            if key in seen:
+                continue
+            seen.add(key)
+            for watched in list(watched_keys(watchers, key)):
+                refs = watchers[watched]
+                live = []
+                for ref in refs:
+                    callback = ref()
+                    if callback is not None:
+                        live.append(ref)
+                        callback(self, key)
+                if len(live) != len(refs):
+                    if live:
+                        watchers[watched] = live
+                    else:
+                        del watchers[watched]
 
     @property
     def context(self):
         return self
 
-    def property(self, fn):
+    def property(self, fn, cache=False, maxsize=128):
         '''
         Declares the function to be a context property (it will be called
         when referenced).
@@ -770,10 +1691,43 @@ class BWContext(BWThrowable):
         >>> ctx.fn = ctx.property(lambda c, s, d: 'hello')
         >>> ctx.fn
         <test/fn => 'hello'>
+
+        With cache set, results are kept per context and subpath (up to
+        maxsize per context) and only recomputed once invalidated (see
+        BWPropertyCache):
+
+        >>> calls = []
+        >>> def render(ctx, subpath, default):
+        ...     calls.append(subpath)
+        ...     return subpath.upper()
+        ...
+        >>> ctx['page.'] = prop = ctx.property(render, cache=True)
+        >>> -ctx.page.home, -ctx.page.home, -ctx.page.about, calls
+        ('HOME', 'HOME', 'ABOUT', ['home', 'about'])
+        >>> prop.invalidate(subpath='home')
+        >>> -ctx.page.home, -ctx.page.about, calls
+        ('HOME', 'ABOUT', ['home', 'about', 'home'])
         '''
 
-        fn.__ctxproperty__ = True
-        return fn
+        return context_property(fn, cache, maxsize)
+
+    def lazy(self, fn):
+        '''
+        Declares the value to be computed by fn(ctx) on first access and
+        then kept (see BWLazyValue).
+
+        >>> calls = []
+        >>> ctx = BWContext('test-lazy')
+        >>> ctx.db = ctx.lazy(lambda ctx: calls.append(ctx) or 'connection')
+        >>> calls
+        []
+        >>> -ctx.db, -ctx(x=1).db
+        ('connection', 'connection')
+        >>> len(calls)
+        1
+        '''
+
+        return BWLazyValue(fn)
 
     def __repr__(self):
         return '<' + self._name + '>'
@@ -788,13 +1742,310 @@ class BWContextInstallable(BWObject):
     def ctx_install(self, ctx):
         pass
 
+class BWFuture(object):
+    '''
+    The result of a background lookup (see BWContext.aget).
+
+    >>> future = BWFuture()
+    >>> future.ready()
+    False
+    >>> future.add_done_callback(lambda done: sys.stdout.write('done\\n'))
+    >>> future.set_result(1)
+    done
+    >>> future.ready(), future.get()
+    (True, 1)
+    '''
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = []
+        self.value = self.error = None
+
+    def ready(self):
+        return self.event.is_set()
+
+    def get(self, timeout=None):
+        '''
+        Waits for and returns the value, raising the lookup's error if it
+        failed or a RuntimeError once timeout seconds have passed.
+        '''
+
+        if not self.event.wait(timeout):
+            raise RuntimeError('Timed out waiting for %r' % (self,))
+        if self.error is not None:
+            raise self.error[0], self.error[1], self.error[2]
+        return self.value
+
+    def add_done_callback(self, fn):
+        '''
+        Calls fn(future) once the future is done (immediately if it is).
+        '''
+
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(fn)
+                return
+        fn(self)
+
+    def set_result(self, value):
+        self.value = value
+        self.done()
+
+    def set_error(self, exc_info):
+        self.error = exc_info
+        self.done()
+
+    def done(self):
+        with self.lock:
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+class LookupPending(BaseException):
+    '''
+    Raised from lazy values still being computed by another thread when
+    looked up in the background, with the BWFuture of that computation.
+    '''
+
+    def __init__(self, pending):
+        BaseException.__init__(self, pending)
+        self.pending = pending
+
+class Background(threading.local):
+    lookup = False
+BACKGROUND = Background()
+
+AGET_POOL = None
+AGET_THREADS = 4
+AGET_LOCK = threading.Lock()
+
+def aget_pool():
+    '''
+    Returns the thread pool used by BWContext.aget, creating it (with
+    AGET_THREADS workers) on first use.
+    '''
+    global AGET_POOL
+    with AGET_LOCK:
+        if AGET_POOL is None:
+            from multiprocessing.pool import ThreadPool
+            AGET_POOL = ThreadPool(AGET_THREADS)
+        return AGET_POOL
+
+def background_get(ctx, key, default, future):
+    '''
+    Looks up key in ctx for future, starting over on aget_pool() once any
+    lazy value being computed by another thread is done.  The future gets
+    any error, and errors that are not Exceptions (such as SystemExit) are
+    raised again for the worker as well:
+
+    >>> def stop(ctx):
+    ...     raise SystemExit(3)
+    >>> future = BWFuture()
+    >>> ctx = BWContext('test-stop', stop=BWLazyValue(stop))
+    >>> try:
+    ...     background_get(ctx, 'stop', None, future)
+    ... except SystemExit:
+    ...     pass
+    >>> future.ready(), future.error[0]
+    (True, <type 'exceptions.SystemExit'>)
+    '''
+
+    BACKGROUND.lookup = True
+    try:
+        value = ctx.get(key, default)
+    except LookupPending, e:
+        e.pending.add_done_callback(lambda done: aget_pool().apply_async(
+            background_get, (ctx, key, default, future)))
+        return
+    except Exception:
+        future.set_error(sys.exc_info())
+        return
+    except:
+        future.set_error(sys.exc_info())
+        raise
+    finally:
+        BACKGROUND.lookup = False
+    future.set_result(value)
+
+class BWLazyValue(object):
+    '''
+    A context value computed by fn(ctx) when first looked up (with the
+    context it was looked up in) and then kept for all contexts seeing
+    it.  Concurrent first lookups wait for a single computation; if it
+    raises, they all get the error and the next lookup tries again.
+
+    >>> lazy = BWLazyValue(lambda ctx: 42)
+    >>> lazy.ready
+    False
+    >>> lazy.__ctxproperty__(None, None, None), lazy.ready
+    (42, True)
+    >>> lazy.reset()
+    >>> lazy.ready
+    False
+    '''
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.ready = False
+        self.lock = threading.Lock()
+        self.pending = None
+
+    def __ctxproperty__(self, ctx, subpath, default, BACKGROUND=BACKGROUND):
+        if self.ready:
+            return self.value
+        with self.lock:
+            if self.ready:
+                return self.value
+            pending = self.pending
+            if pending is None:
+                self.pending = computing = BWFuture()
+        if pending is not None:
+            if BACKGROUND.lookup:
+                raise LookupPending(pending)
+            return pending.get()
+        lookup, BACKGROUND.lookup = BACKGROUND.lookup, False
+        try:
+            value = self.fn(ctx)
+        except:
+            with self.lock:
+                self.pending = None
+            computing.set_error(sys.exc_info())
+            raise
+        finally:
+            BACKGROUND.lookup = lookup
+        with self.lock:
+            self.value = value
+            self.ready = True
+            self.pending = None
+        computing.set_result(value)
+        return value
+
+    def reset(self):
+        '''
+        Forgets the value, so it is computed again on the next lookup.
+        '''
+
+        with self.lock:
+            self.ready = False
+            self.__dict__.pop('value', None)
+
+class BWPropertyCache(object):
+    '''
+    Results of a context property by context (weakly referenced) and
+    subpath, keeping the maxsize (None for no limit) most recently used per
+    context.  Results that are the default are not kept.  The results are
+    locked while they are read and written (as lookups may run on the
+    aget_pool()), though not while the property computes a result.
+    '''
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.results = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def lookup(self, fn, ctx, subpath, default, NOT_FOUND=NOT_FOUND):
+        with self.lock:
+            results = self.results.get(ctx)
+            if results is None:
+                results = self.results[ctx] = OrderedDict()
+            obj = results.pop(subpath, NOT_FOUND)
+            if obj is not NOT_FOUND:
+                results[subpath] = obj
+                return obj
+        obj = fn(ctx, subpath, default)
+        if obj is default:
+            return obj
+        with self.lock:
+            results.pop(subpath, None)
+            if self.maxsize is not None and len(results) >= self.maxsize:
+                results.popitem(last=False)
+            results[subpath] = obj
+        return obj
+
+    def invalidate(self, ctx=None, subpath=None):
+        '''
+        Forgets the results for ctx and/or subpath (all if neither).
+        '''
+
+        with self.lock:
+            if ctx is None:
+                contexts = self.results.values()
+            else:
+                contexts = filter(None, [self.results.get(ctx)])
+            for results in contexts:
+                if subpath is None:
+                    results.clear()
+                else:
+                    results.pop(subpath, None)
+
+class BWCachedContextProperty(object):
+    '''
+    A context property function whose results are cached (see
+    BWContext.property).  Results go away with the property once it is
+    replaced or deleted in its context.
+    '''
+
+    def __init__(self, fn, maxsize=128):
+        self.fn = fn
+        self.cache = BWPropertyCache(maxsize)
+
+    def __ctxproperty__(self, ctx, subpath, default):
+        return self.cache.lookup(self.fn, ctx, subpath, default)
+
+    def invalidate(self, ctx=None, subpath=None):
+        self.cache.invalidate(ctx, subpath)
+
+def context_property(fn, cache=False, maxsize=128):
+    if cache:
+        return BWCachedContextProperty(fn, maxsize)
+    fn.__ctxproperty__ = True
+    return fn
+
 class BWContextProperty(BWObject):
+    '''
+    Base class of context property objects, which answer lookups through
+    ctx_access.  Subclasses setting ctx_cache have the results cached per
+    context and subpath (up to ctx_maxsize per context) until
+    ctx_invalidate is called:
+
+    >>> class Counter(BWContextProperty):
+    ...     ctx_cache = True
+    ...     count = 0
+    ...
+    ...     def ctx_access(self, ctx, subpath, default):
+    ...         self.count += 1
+    ...         return self.count
+    ...
+    >>> ctx = BWContext('test-cached-property')
+    >>> ctx['count.'] = counter = Counter()
+    >>> -ctx.count.a, -ctx.count.a, -ctx.count.b
+    (1, 1, 2)
+    >>> counter.ctx_invalidate()
+    >>> -ctx.count.a
+    3
+    '''
+
+    ctx_cache = False
+    ctx_maxsize = 128
+
     def __ctxproperty__(self, ctx, subpath, default):
+        if self.ctx_cache:
+            return self.ctx_results.lookup(self.ctx_access, ctx, subpath,
+                                           default)
         return self.ctx_access(ctx, subpath, default)
 
     def ctx_access(self, ctx, subpath, default):
         return default
 
+    @cached
+    def ctx_results(self):
+        return BWPropertyCache(self.ctx_maxsize)
+
+    def ctx_invalidate(self, ctx=None, subpath=None):
+        self.ctx_results.invalidate(ctx, subpath)
+
 class BWContextRef(BWObject):
     def __pos__(self, NOT_FOUND=NOT_FOUND):
         obj = self._self(NOT_FOUND)
@@ -829,21 +2080,47 @@ class BWContextRef(BWObject):
     def _self(self, default=None):
         return default
 
-    def property(self, fn):
-        fn.__ctxproperty__ = True
-        return fn
+    def property(self, fn, cache=False, maxsize=128):
+        return context_property(fn, cache, maxsize)
+
+    def lazy(self, fn):
+        return BWLazyValue(fn)
 
     def expose(self, obj, *members):
         for member in members:
             self[member] = self.property(lambda c, s, p: getattr(obj, member))
 
 class BWBoundContextRef(BWContextRef):
+    '''
+    A reference to path in a context.  References keep those made by
+    attribute access on them for the next access, while contexts make a
+    new one each time, so that a context never refers to itself through a
+    reference and is still freed by refcount:
+
+    >>> import gc
+    >>> gc.disable()
+    >>> ctx = BWContext('request', a=1)
+    >>> -ctx.a.b, -ctx.a
+    (None, 1)
+    >>> ref = weakref.ref(ctx)
+    >>> del ctx
+    >>> ref() is None
+    True
+    >>> gc.enable()
+    '''
+
     def __init__(self, ctx, path):
         self.__dict__['_ctx'] = ctx
         self.__dict__['_path'] = path
 
     def __getattr__(self, name):
-        return type(self)(self._ctx, self._path + '.' + name.replace('__', '_'))
+        if name.startswith('__'):
+            raise AttributeError(name)
+        d = self.__dict__
+        ref = type(self)(self._ctx, join_path(self._path, name))
+        if len(d) < REFS_LIMIT:
+            d[name] = ref
+        return ref
 
     def __setattr__(self, name, value):
         self[name.replace('__', '_')] = value
@@ -878,7 +2155,7 @@ class BWBoundContextRef(BWContextRef):
     def _ctxtype(self):
         return type(self._ctx)
 
-    @cached
+    @property
     def context(self):
         return self._ctx
 
@@ -888,19 +2165,24 @@ class BWUnboundContextRef(BWContextRef):
         self.__dict__['_path'] = path
 
     def __getattr__(self, name):
-        return type(self)(self._ctxtype,
-                          self._path + '.' + name.replace('__', '_'))
+        if name.startswith('__'):
+            raise AttributeError(name)
+        d = self.__dict__
+        ref = unbound_ref(self._ctxtype, join_path(self._path, name))
+        if len(d) < REFS_LIMIT:
+            d[name] = ref
+        return ref
 
     def __getitem__(self, subpath):
         if subpath:
-            return type(self)(self._ctxtype, self._path + '.' + subpath)
+            return unbound_ref(self._ctxtype, self._path + '.' + subpath)
         else:
             return self
 
     def __repr__(self):
         return '<*%s/%s>' % (self._ctxtype.__name__, self._path)
 
-    @cached
+    @property
     def context(self):
         return self._ctxtype(self._ctxtype.CURRENT)
 
@@ -8,7 +8,365 @@ flavour to make things fit in a Pythonic world.
 '''
 
 from __version__ import *
-from bwobject import BWObject
+from bwobject import BWObject, BWObjectMeta, ATTRIBUTE_WATCHERS, CLASS_WATCHERS
+from bwcached import MemoCache
+from collections import namedtuple
+import types, inspect, linecache, itertools, threading, timeit, sys, time
+import weakref
+
+# Attribute types found in class dictionaries that can be called directly
+# with the instance as the first argument.
+UNBOUND_TYPES = (types.FunctionType, type(object.__init__),
+                 type(object.__format__))
+
+# Per-name sets of the resolved super implementation caches of all live
+# generated wrappers (see SuperMethodBuilder.get_wrapper_dict).
+SUPERS = {}
+
+# Names of methods with at least one flattenable layer (see flatten).
+FLAT_NAMES = set()
+
+NOT_FOUND = KeyError
+
+def find_attr(name, mro, start=0, NOT_FOUND=NOT_FOUND):
+    '''
+    Returns the first definition of name in the classes of mro from start
+    on, looking through flattened functions (see flatten) to the
+    definitions they replaced.  Returns None if there is none.
+    '''
+    for base in mro[start:]:
+        attr = base.__dict__.get(name, NOT_FOUND)
+        attr = getattr(attr, '__bwflat__', attr)
+        if attr is not NOT_FOUND:
+            return attr
+    return None
+
+# Set in __flags__ of classes created by class statements (not built in).
+HEAPTYPE = 1 << 9
+
+def unwatched(name, mro, start=0, HEAPTYPE=HEAPTYPE):
+    '''
+    Returns True if a class in mro from start on that is not watched by
+    BWObjectMeta (see ATTRIBUTE_WATCHERS) defines name, so its definition
+    could be replaced unseen.  Built-in types cannot be changed.
+    '''
+
+    for base in mro[start:]:
+        if (name in base.__dict__ and base.__flags__ & HEAPTYPE and
+            not isinstance(base, BWObjectMeta)):
+            return True
+    return False
+
+class SuperCache(dict):
+    '''
+    The implementations a generated wrapper resolved by id of the concrete
+    class.  Classes are only weakly referenced and their entries go away
+    with them.
+
+    >>> import gc
+    >>> class Base(BWObject):
+    ...     def fn(self):
+    ...         return 'base'
+    ...
+    >>> class Sub(Base):
+    ...     @after_super
+    ...     def fn(self):
+    ...         pass
+    ...
+    >>> class Dynamic(Sub):
+    ...     pass
+    ...
+    >>> Dynamic().fn()
+    'base'
+    >>> supers = Sub.__dict__['fn'].func_globals['supers']
+    >>> len(supers)
+    1
+    >>> del Dynamic
+    >>> _ = gc.collect()
+    >>> len(supers)
+    0
+    '''
+
+    __slots__ = ('classes', '__weakref__')
+
+    def __init__(self):
+        self.classes = {}
+
+    def add(self, concrete, fn):
+        key = id(concrete)
+        if key not in self.classes:
+            self.classes[key] = weakref.ref(concrete,
+                                            lambda ref: self.forget(key))
+        self[key] = fn
+
+    def forget(self, key):
+        self.pop(key, None)
+        self.classes.pop(key, None)
+
+    def forget_subclasses(self, changed):
+        for key, ref in self.classes.items():
+            concrete = ref()
+            if concrete is not None and changed in concrete.__mro__:
+                self.forget(key)
+
+def forget_supers(changed, name):
+    for supers in SUPERS.get(name, {}).values():
+        supers.forget_subclasses(changed)
+ATTRIBUTE_WATCHERS.append(forget_supers)
+
+# Local names used by generated wrappers that parameters must not shadow.
+WRAPPER_LOCALS = frozenset(('res', 'override', 'super_fn', 'wrapper',
+                            '_start', '_cache', '_results', '_key', '_entry'))
+
+LayerStats = namedtuple('LayerStats', 'label calls total own')
+
+class LayerProfile(object):
+    '''
+    Accumulates call counts and times of instrumented wrappers (see
+    instrument) per layer.  The total time of a layer includes the layers
+    it calls; its own time excludes instrumented layers below it but
+    includes anything else it calls, such as the base implementation.
+    '''
+
+    def __init__(self, timer=timeit.default_timer):
+        self.timer = timer
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def enter(self):
+        try:
+            stack = self.local.stack
+        except AttributeError:
+            stack = self.local.stack = []
+        stack.append(0.0)
+        return self.timer()
+
+    def leave(self, label, start):
+        elapsed = self.timer() - start
+        stack = self.local.stack
+        inner = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with self.lock:
+            entry = self.stats.get(label)
+            if entry is None:
+                entry = self.stats[label] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += elapsed - inner
+
+    def report(self):
+        '''
+        Returns a LayerStats for each layer called so far, most own time
+        first.
+        '''
+
+        with self.lock:
+            stats = [LayerStats(label, *entry)
+                     for label, entry in self.stats.iteritems()]
+        stats.sort(key=lambda stat: stat.own, reverse=True)
+        return stats
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+
+# Instrumentation settings for wrappers defined from now on (see instrument).
+INSTRUMENTED = False
+PROFILE = None
+SOURCE_IDS = itertools.count(2)
+
+def instrument(enabled=True, profile=None):
+    '''
+    Instruments the wrappers of methods defined while enabled.  Their code
+    is named after the layer (e.g. <bw:Class.method:after_super>) and their
+    source is registered with linecache so that profilers and tracebacks
+    can tell the layers apart.  Instrumented layers are not flattened (see
+    flatten).  If a LayerProfile is given, each call is also counted and
+    timed into it.  Returns profile.
+
+    >>> profile = instrument(profile=LayerProfile())
+    >>> class Base(BWObject):
+    ...     def area(self, width):
+    ...         return width
+    ...
+    >>> class Sub(Base):
+    ...     @after_super
+    ...     def area(self, width):
+    ...         pass
+    ...
+    >>> class Subsub(Sub):
+    ...     @before_super
+    ...     def area(self, width):
+    ...         pass
+    ...
+    >>> instrument(False)
+    >>> Subsub().area(2), Subsub().area(3), Sub().area(4)
+    (2, 3, 4)
+    >>> code = Subsub.area.func_code
+    >>> code.co_filename, code.co_name
+    ('<bw:Subsub.area:before_super>', 'Subsub.area:before_super')
+    >>> print linecache.getline(code.co_filename, 1),
+    def wrapper(_self, width):
+    >>> for stat in sorted(profile.report()):
+    ...     print stat.label, stat.calls, stat.total >= stat.own >= 0
+    Sub.area:after_super 3 True
+    Subsub.area:before_super 2 True
+    '''
+
+    global INSTRUMENTED, PROFILE
+    INSTRUMENTED = enabled
+    PROFILE = profile if enabled else None
+    return PROFILE
+
+def register_source(filename, src):
+    '''
+    Registers generated source with linecache under filename, returning
+    the filename used (made unique if another source has it).
+    '''
+
+    lines = [line + '\n' for line in src.splitlines()]
+    unique = filename
+    while linecache.cache.get(unique, (None, None, lines))[2] != lines:
+        unique = '%s#%d>' % (filename[:-1], next(SOURCE_IDS))
+    linecache.cache[unique] = (len(src), None, lines, unique)
+    return unique
+
+def relabel(fn, name):
+    '''
+    Returns a copy of fn whose code object is called name.
+    '''
+
+    c = fn.func_code
+    code = types.CodeType(c.co_argcount, c.co_nlocals, c.co_stacksize,
+                          c.co_flags, c.co_code, c.co_consts, c.co_names,
+                          c.co_varnames, c.co_filename, name,
+                          c.co_firstlineno, c.co_lnotab, c.co_freevars,
+                          c.co_cellvars)
+    return types.FunctionType(code, fn.func_globals, fn.__name__,
+                              fn.func_defaults, fn.func_closure)
+
+def chain_generators(*factories):
+    '''
+    Runs the generators returned by each of factories in turn, passing on
+    values sent and exceptions thrown to the running one (as PEP 380's
+    yield from would).  Factories returning None are skipped.
+
+    Before, after and follow_super wrappers of generator methods (such as
+    generator-based coroutines) use this to run the base and subclass
+    generators in order:
+
+    >>> class Echo(BWObject):
+    ...     def talk(self, greeting):
+    ...         got = yield greeting
+    ...         yield 'echo ' + got
+    ...
+    >>> class Polite(Echo):
+    ...     @before_super
+    ...     def talk(self, greeting):
+    ...         yield 'hello'
+    ...
+    >>> class Parting(Polite):
+    ...     @after_super
+    ...     def talk(self, greeting):
+    ...         yield 'bye'
+    ...
+    >>> talk = Parting().talk('ready')
+    >>> next(talk), next(talk), talk.send('hi'), next(talk)
+    ('hello', 'ready', 'echo hi', 'bye')
+
+    Generators cannot return results in Python 2, so filter_super and
+    want_result are not available for them and before_super generators
+    cannot override the base.  Around_super methods receive super_fn and
+    can run the generator it returns themselves.
+
+    >>> class Bad(Echo):
+    ...     @filter_super
+    ...     def talk(self, res, greeting):
+    ...         yield res
+    ...
+    Traceback (most recent call last):
+        ...
+    TypeError: Cannot get base result in generator methods
+    '''
+
+    for factory in factories:
+        gen = factory()
+        if gen is None:
+            continue
+        try:
+            value = next(gen)
+        except StopIteration:
+            continue
+        while True:
+            try:
+                sent = yield value
+            except GeneratorExit:
+                gen.close()
+                raise
+            except BaseException:
+                try:
+                    value = gen.throw(*sys.exc_info())
+                except StopIteration:
+                    break
+            else:
+                try:
+                    value = gen.send(sent)
+                except StopIteration:
+                    break
+
+def get_argspec(fn):
+    '''
+    Returns the (args, defaults) of a plain Python function if it takes
+    only named arguments, otherwise None.
+
+    >>> get_argspec(lambda self, a, b=2: None)
+    (['self', 'a', 'b'], (2,))
+    >>> get_argspec(lambda self, *args: None)
+    >>> get_argspec(len)
+    '''
+    if type(fn) is not types.FunctionType:
+        return None
+    args, varargs, keywords, defaults = inspect.getargspec(fn)
+    if varargs or keywords or not all(isinstance(a, str) for a in args):
+        return None
+    return args, defaults or ()
+
+def adapt_call(fn, argnames, defaults, NOT_FOUND=NOT_FOUND):
+    '''
+    Returns fn, or if it is a function whose arguments (past self) differ
+    from argnames (with defaults for the last of them), a function taking
+    argnames positionally that calls fn with them by keyword.  Arguments
+    left at those defaults are left to fn's own defaults.
+
+    >>> fn = adapt_call(lambda self, b, a=3: (a, b), ('a', 'b'), (2,))
+    >>> fn(None, 1, 5), fn(None, 1, 2)
+    ((1, 5), (1, 2))
+    >>> fn = adapt_call(lambda self, b=4, a=3: (a, b), ('a', 'b'), (2,))
+    >>> fn(None, 1, 2)
+    (1, 4)
+    '''
+
+    spec = get_argspec(fn)
+    if spec is None:
+        return fn
+    args, fn_defaults = spec
+    args = args[1:]
+    offset = len(argnames) - len(defaults)
+    if args == list(argnames) and fn_defaults == tuple(defaults):
+        return fn
+    own = set(args[len(args) - len(fn_defaults):])
+    skip = [defaults[i - offset] if i >= offset and name in own
+            else NOT_FOUND for i, name in enumerate(argnames)]
+    pairs = zip(argnames, skip)
+    def call(_self, *values):
+        kw = {}
+        for (name, default), value in zip(pairs, values):
+            if value is not default:
+                kw[name] = value
+        return fn(_self, **kw)
+    return call
 
 class MethodBuilder(BWObject):
     '''
@@ -58,6 +416,9 @@ class MethodBuilder(BWObject):
     want_args = True
     want_result = False
     can_override = False
+    argnames = None
+    argdefaults = ()
+    label = None
 
     def __new__(cls, fn=None, **_kw):
         if fn is None:
@@ -67,6 +428,8 @@ class MethodBuilder(BWObject):
 
     def __init__(self, fn, **_kw):
         self.fn = fn
+        self.instrumented = INSTRUMENTED
+        self.profile = PROFILE
         self.init(**_kw)
 
     def init(self, require_base=None, want_args=None,
@@ -87,13 +450,32 @@ class MethodBuilder(BWObject):
         return method
 
     def build_wrapper(self, cls, name):
-        code = ['def wrapper(_self, *_args, **_kw):']
-        self.encode_wrapper(code)
         v = self.get_wrapper_dict(cls, name)
-        src = '\n'.join(code)
-        exec src in v
-        wrapper = v.pop('wrapper')
+        params = self.get_wrapper_params(cls, name, v)
+        if params is None:
+            self.argnames = None
+            code = ['def wrapper(_self, *_args, **_kw):']
+        else:
+            self.argnames = tuple(p.split('=')[0] for p in params)
+            self.argdefaults = tuple(v[p.split('=')[1]] for p in params
+                                     if '=' in p)
+            code = ['def wrapper(%s):' % ', '.join(('_self',) + params)]
+        self.encode_wrapper(code)
+        if self.instrumented:
+            label = self.get_label(cls, name)
+            if self.profile is not None:
+                code = self.encode_profiled(code, label, v)
+            src = '\n'.join(code)
+            filename = register_source('<bw:%s>' % label, src)
+            exec compile(src, filename, 'exec') in v
+            wrapper = relabel(v.pop('wrapper'), label)
+        else:
+            src = '\n'.join(code)
+            exec src in v
+            wrapper = v.pop('wrapper')
         wrapper.__src__ = src
+        wrapper.__builder__ = self
+        wrapper.__bwclass__ = cls
         return wrapper
 
     def get_wrapper_dict(self, cls, name):
@@ -102,12 +484,91 @@ class MethodBuilder(BWObject):
             d['type_none'] = type(None)
         return d
 
+    def get_wrapper_params(self, cls, name, v):
+        '''
+        Returns the parameters (after _self) of the generated wrapper as
+        source strings, adding any default values to the wrapper dict v.
+        None (the default) generates a generic *_args, **_kw wrapper.
+        '''
+        return None
+
+    def get_label(self, cls, name):
+        return '%s.%s:%s' % (cls.__name__, name, self.label or
+                             type(self).__name__)
+
+    def encode_profiled(self, code, label, v):
+        '''
+        Returns the wrapper code with its body timed into self.profile.
+        '''
+
+        v.update(_enter=self.profile.enter, _leave=self.profile.leave,
+                 _label=label)
+        return code[:1] + [
+            '    _start = _enter()',
+            '    try:',
+        ] + ['    ' + line for line in code[1:]] + [
+            '    finally:',
+            '        _leave(_label, _start)',
+        ]
+
+    def get_call_args(self):
+        if self.argnames is None:
+            return ('*_args', '**_kw')
+        else:
+            return self.argnames
+
     def encode_wrapper(self, code):
         raise NotImplementedError('No encode defined for %r' % self)
 
 class SuperMethodBuilder(MethodBuilder):
     '''
     Base class for all super-class overriding methods.
+
+    Rather than building a super() object on each call, the generated
+    wrappers look up the next implementation in the MRO of the instance's
+    class once and keep it in a per-wrapper SuperCache keyed by that class.
+    Entries are dropped when the attribute is reassigned on a BWObject
+    class in the MRO:
+
+    >>> class Base(BWObject):
+    ...     def fn(self):
+    ...         return 'base'
+    ...
+    >>> class Middle(Base):
+    ...     pass
+    ...
+    >>> class Sub(Middle):
+    ...     @after_super(want_result=True, can_override=True)
+    ...     def fn(self, res):
+    ...         return res.upper()
+    ...
+    >>> Sub().fn()
+    'BASE'
+    >>> Middle.fn = lambda self: 'middle'
+    >>> Sub().fn()
+    'MIDDLE'
+    >>> del Middle.fn
+    >>> Sub().fn()
+    'BASE'
+
+    Changes to classes not derived from BWObject cannot be seen, so the
+    implementation is looked up on every call when one of those defines
+    the method:
+
+    >>> class Mixin(object):
+    ...     def fn(self):
+    ...         return 'mix'
+    ...
+    >>> class Mixed(Mixin, Base):
+    ...     @after_super(want_result=True, can_override=True)
+    ...     def fn(self, res):
+    ...         return res.upper()
+    ...
+    >>> Mixed().fn()
+    'MIX'
+    >>> Mixin.fn = lambda self: 'mix2'
+    >>> Mixed().fn()
+    'MIX2'
     '''
 
     def __bindclass__(self, cls, name):
@@ -115,36 +576,190 @@ class SuperMethodBuilder(MethodBuilder):
             if getattr(super(cls, cls), name, None) is None:
                 raise TypeError('Method %r is required in superclasses of %r' %
                     (name, cls.__name__))
+        if self.can_flatten():
+            FLAT_NAMES.add(name)
         return super(SuperMethodBuilder, self).__bindclass__(cls, name)
 
+    def get_wrapper_dict(self, cls, name):
+        d = super(SuperMethodBuilder, self).get_wrapper_dict(cls, name)
+        supers = SuperCache()
+        def resolve(concrete):
+            fn = self.find_super(cls, name, concrete)
+            if self.argnames is not None:
+                fn = adapt_call(fn, self.argnames, self.argdefaults)
+            mro = concrete.__mro__
+            if not unwatched(name, mro, mro.index(cls) + 1):
+                supers.add(concrete, fn)
+            return fn
+        SUPERS.setdefault(name, weakref.WeakValueDictionary())[
+            id(supers)] = supers
+        d.update(supers=supers, resolve=resolve)
+        if self.generator:
+            d['chain_generators'] = chain_generators
+        return d
+
+    def init(self, **_kw):
+        super(SuperMethodBuilder, self).init(**_kw)
+        self.generator = inspect.isgeneratorfunction(self.fn)
+        if self.generator and self.want_result:
+            raise TypeError('Cannot get base result in generator methods')
+
+    def get_wrapper_params(self, cls, name, v, WRAPPER_LOCALS=WRAPPER_LOCALS):
+        '''
+        Wrappers take the same named arguments and defaults as the methods
+        they wrap, avoiding the packing of *_args and **_kw on each call.
+        This happens when the function's arguments (past self and any
+        injected arguments) match those of the base implementation, or
+        when there is no base:
+
+        >>> class Base(BWObject):
+        ...     def area(self, width, height=1):
+        ...         return width * height
+        ...
+        >>> class Sub(Base):
+        ...     @after_super
+        ...     def area(self, width, height=1):
+        ...         pass
+        ...
+        ...     @around_super(require_base=False)
+        ...     def other(self, super_fn, x, y=None):
+        ...         return (x, y)
+        ...
+        >>> print Sub.area.__src__.splitlines()[0]
+        def wrapper(_self, width, height=_default_0):
+        >>> Sub().area(2), Sub().area(2, height=3), Sub().other(1)
+        (2, 6, (1, None))
+
+        Otherwise, the generic form is used:
+
+        >>> class Loose(Base):
+        ...     @before_super
+        ...     def area(self, *args):
+        ...         pass
+        ...
+        >>> print Loose.area.__src__.splitlines()[0]
+        def wrapper(_self, *_args, **_kw):
+
+        The signature comes from the defining class's bases, so when a
+        subclass's MRO puts an implementation taking other arguments next,
+        that one is called by keyword (see adapt_call):
+
+        >>> class Swapped(Base):
+        ...     def area(self, height, width=2):
+        ...         return ('swapped', width, height)
+        ...
+        >>> class Both(Sub, Swapped):
+        ...     pass
+        ...
+        >>> Both().area(width=3, height=4)
+        ('swapped', 3, 4)
+        '''
+
+        base = self.find_super_attr(cls, name, cls.__mro__)
+        basespec = None
+        if type(base) is types.FunctionType:
+            basespec = get_argspec(base)
+            if basespec is not None:
+                basespec = (basespec[0][1:], basespec[1])
+        if self.want_args:
+            spec = get_argspec(self.fn)
+            if spec is None:
+                return None
+            skip = 1 + len(self.get_fn_positional_args())
+            args, defaults = spec
+            args = args[skip:]
+            defaults = defaults[len(defaults) - len(args):] if args else ()
+            if base is not None and basespec != (args, defaults):
+                return None
+        elif basespec is not None:
+            args, defaults = basespec
+        else:
+            return None
+        if WRAPPER_LOCALS.intersection(args) or set(v).intersection(args):
+            return None
+        params = list(args)
+        offset = len(args) - len(defaults)
+        for i, default in enumerate(defaults):
+            key = '_default_%d' % i
+            v[key] = default
+            params[offset + i] += '=' + key
+        return tuple(params)
+
+    def find_super_attr(self, cls, name, mro):
+        return find_attr(name, mro, mro.index(cls) + 1)
+
+    def find_super(self, cls, name, concrete, UNBOUND_TYPES=UNBOUND_TYPES):
+        '''
+        Returns a function that calls the implementation of name following
+        cls in the MRO of concrete, with the instance as first argument.
+        '''
+
+        attr = self.find_super_attr(cls, name, concrete.__mro__)
+        if attr is None:
+            if self.require_base:
+                raise AttributeError(name)
+            return None
+        if isinstance(attr, UNBOUND_TYPES):
+            return attr
+        else:
+            # Other descriptors (staticmethod, etc) are bound by super().
+            return lambda _self, *_args, **_kw: \
+                getattr(super(cls, _self), name)(*_args, **_kw)
+
+    def encode_get_super(self, code):
+        code.extend((
+            '    try:',
+            '        super_fn = supers[id(type(_self))]',
+            '    except KeyError:',
+            '        super_fn = resolve(type(_self))',
+        ))
+
     def encode_get_base_result(self, code):
+        self.encode_get_super(code)
+        call = 'super_fn(%s)' % ', '.join(('_self',) + self.get_call_args())
         if self.require_base:
-            code.append(
-                '    res = getattr(super(cls, _self), name)(*_args, **_kw)',
-            )
+            code.append('    res = ' + call)
         else:
             code.extend((
-                '    super_fn = getattr(super(cls, _self), name, None)',
                 '    if super_fn is None:',
                 '        res = None',
                 '    else:',
-                '        res = super_fn(*_args, **_kw)'
+                '        res = ' + call,
             ))
 
+    def encode_chain(self, code):
+        '''
+        Encodes a wrapper returning a generator that runs the generator
+        from fn and the base's in flat_order (see chain_generators).
+        '''
+
+        self.encode_get_super(code)
+        call = 'super_fn(%s)' % ', '.join(('_self',) + self.get_call_args())
+        if not self.require_base:
+            call = 'None if super_fn is None else ' + call
+        calls = [self.get_fn_call(), call]
+        if self.flat_order == 'after':
+            calls.reverse()
+        code.append('    return chain_generators(lambda: %s, lambda: %s)' %
+                    tuple(calls))
+
     def encode_do_fn(self, code):
         if self.can_override:
             code.append('    override = ' + self.get_fn_call())
         else:
             code.append('    ' + self.get_fn_call())
 
-    def get_fn_call(self):
+    def get_fn_call(self, fn='fn'):
         args = ('_self',) + self.get_fn_positional_args()
         if self.want_args:
-            args += ('*_args',)
+            if self.argnames is None:
+                args += ('*_args',)
+            else:
+                args += self.argnames
         args += self.get_fn_keyword_args()
-        if self.want_args:
+        if self.want_args and self.argnames is None:
             args += ('**_kw',)
-        return 'fn(%s)' % ', '.join(args)
+        return '%s(%s)' % (fn, ', '.join(args))
 
     def get_fn_positional_args(self):
         if self.want_result:
@@ -167,6 +782,41 @@ class SuperMethodBuilder(MethodBuilder):
     def encode_return(self, code):
         code.append('    return res')
 
+    # 'before' or 'after' for builders whose layers can be flattened.
+    flat_order = None
+
+    def can_flatten(self):
+        if self.instrumented or self.generator:
+            return False
+        return (self.flat_order == 'after' or
+                (self.flat_order == 'before' and not self.want_result))
+
+    def encode_flat(self, code, indent, fn, inner):
+        '''
+        Encodes this layer of a flattened function (see flatten) calling
+        fn, with inner encoding the layers below it.  Each layer leaves
+        its result in res.
+        '''
+
+        call = self.get_fn_call(fn)
+        if self.flat_order == 'after':
+            inner(code, indent)
+        if self.can_override:
+            code.extend((
+                indent + 'override = ' + call,
+                indent + 'if override is type_none:',
+                indent + '    res = None',
+                indent + 'elif override is not None:',
+                indent + '    res = override',
+            ))
+            if self.flat_order == 'before':
+                code.append(indent + 'else:')
+                inner(code, indent + '    ')
+        else:
+            code.append(indent + call)
+            if self.flat_order == 'before':
+                inner(code, indent)
+
 class OverrideSuperMethodBuild(SuperMethodBuilder):
     '''
     >>> class Sub(BWObject):
@@ -194,6 +844,8 @@ class OverrideSuperMethodBuild(SuperMethodBuilder):
     'World'
     '''
 
+    label = 'override_super'
+
     def build_wrapper(self, cls, name):
         return self.fn
 override_super = OverrideSuperMethodBuild
@@ -220,10 +872,14 @@ class BeforeSuperMethodBuilder(SuperMethodBuilder):
     0
     '''
 
+    label = 'before_super'
     can_override = True
+    flat_order = 'before'
 
     @override_super
     def encode_wrapper(self, code):
+        if self.generator:
+            return self.encode_chain(code)
         self.encode_do_fn(code)
         self.encode_override(code)
         self.encode_get_base_result(code)
@@ -254,8 +910,13 @@ class AfterSuperMethodBuilder(SuperMethodBuilder):
     5
     '''
 
+    label = 'after_super'
+    flat_order = 'after'
+
     @override_super
     def encode_wrapper(self, code):
+        if self.generator:
+            return self.encode_chain(code)
         self.encode_get_base_result(code)
         self.encode_do_fn(code)
         self.encode_override(code)
@@ -280,6 +941,7 @@ class FollowSuperMethodBuilder(AfterSuperMethodBuilder):
     >>> s.x
     10
     '''
+    label = 'follow_super'
     want_args = False
     can_override = False
 follow_super = FollowSuperMethodBuilder
@@ -302,6 +964,7 @@ class FilterSuperMethodBuilder(AfterSuperMethodBuilder):
     >>> q.apply(2)
     8
     '''
+    label = 'filter_super'
     want_result = True
     can_override = True
 filter_super = FilterSuperMethodBuilder
@@ -364,8 +1027,10 @@ class AroundSuperMethodBuilder(SuperMethodBuilder):
     ...         # Carry on...
     '''
 
+    label = 'around_super'
     want_result = False
     can_override = False
+    flat_order = None
 
     @override_super
     def encode_wrapper(self, code):
@@ -381,17 +1046,560 @@ class AroundSuperMethodBuilder(SuperMethodBuilder):
 
     @override_super
     def encode_do_fn(self, code):
+        self.encode_get_super(code)
         if self.require_base:
-            code.append('    super_fn = getattr(super(cls, _self), name)')
+            code.append('    super_fn = method_type(super_fn, _self)')
         else:
-            code.append('    super_fn = getattr(super(cls, _self), name, None)')
+            code.extend((
+                '    if super_fn is not None:',
+                '        super_fn = method_type(super_fn, _self)',
+            ))
         code.append('    res = ' + self.get_fn_call())
 
+    @filter_super
+    def get_wrapper_dict(self, d, cls, name):
+        d['method_type'] = types.MethodType
+        return d
+
     @filter_super(want_args=False)
     def get_fn_positional_args(self, res):
         return res + ('super_fn',)
 around_super = AroundSuperMethodBuilder
 
+class MemoizeSuperMethodBuilder(AfterSuperMethodBuilder):
+    '''
+    Caches the results of the base implementation by their arguments.  On
+    a miss, the base is called and then the method (which, as with
+    after_super, can override the result) before the result is kept.
+    Each instance holds up to maxsize results, discarding the least
+    recently used beyond that:
+
+    >>> class Base(BWObject):
+    ...     calls = 0
+    ...     def area(self, width, height=1):
+    ...         self.calls += 1
+    ...         return width * height
+    ...
+    >>> class Sub(Base):
+    ...     @memoize_super(maxsize=2)
+    ...     def area(self, width, height=1):
+    ...         if width < 0:
+    ...             return override_result(None)
+    ...
+    >>> s = Sub()
+    >>> s.area(2), s.area(2), s.area(2, 3), s.area(-1), s.area(-1)
+    (2, 2, 6, None, None)
+    >>> s.calls, Sub.area.cache_for(s)
+    (3, <MemoCache hits=2 misses=3 size=2>)
+
+    A key function can derive the key from the arguments instead, results
+    can expire after ttl seconds (by clock, time.time by default) and
+    per_class=True shares a single cache between all instances of the
+    class and its subclasses:
+
+    >>> now = [0]
+    >>> class Shared(Base):
+    ...     @memoize_super(per_class=True, key=lambda width, height=1: width,
+    ...                    ttl=10, clock=lambda: now[0])
+    ...     def area(self, width, height=1):
+    ...         pass
+    ...
+    >>> a, b = Shared(), Shared()
+    >>> a.area(2), b.area(2, 5), a.calls + b.calls
+    (2, 2, 1)
+    >>> now[0] = 10
+    >>> b.area(2, 5), a.calls + b.calls
+    (10, 2)
+    >>> Shared.area.cache_for()
+    <MemoCache hits=1 misses=2 size=1>
+
+    The shared cache is locked while it is read and written, though not
+    while the base runs.  Instances without a __dict__ have their caches
+    kept by the builder for as long as they live:
+
+    >>> from bwobject import BWObjectMeta
+    >>> class Compact(object):
+    ...     __metaclass__ = BWObjectMeta
+    ...     __slots__ = ('__weakref__',)
+    ...
+    ...     def area(self, width, height=1):
+    ...         return width * height
+    ...
+    >>> class MemoCompact(Compact):
+    ...     __slots__ = ()
+    ...
+    ...     @memoize_super
+    ...     def area(self, width, height=1):
+    ...         pass
+    ...
+    >>> c = MemoCompact()
+    >>> c.area(3), c.area(3)
+    (3, 3)
+    >>> MemoCompact.area.cache_for(c)
+    <MemoCache hits=1 misses=1 size=1>
+    >>> del c
+    >>> MemoCompact.area.__builder__.instances
+    {}
+    '''
+
+    label = 'memoize_super'
+    can_override = True
+    flat_order = None
+
+    def init(self, maxsize=128, key=None, ttl=None, per_class=False,
+             clock=time.time, **_kw):
+        super(MemoizeSuperMethodBuilder, self).init(**_kw)
+        if self.generator:
+            raise TypeError('Cannot memoize generator methods')
+        self.maxsize = maxsize
+        self.key = key
+        self.ttl = ttl
+        self.per_class = per_class
+        self.clock = clock
+        self.shared = MemoCache(maxsize) if per_class else None
+        self.lock = threading.Lock()
+        self.instances = {}
+
+    @filter_super
+    def get_wrapper_dict(self, d, cls, name):
+        d.update(memo_key=self.key, clock=self.clock, ttl=self.ttl,
+                 maxsize=self.maxsize, new_cache=self.new_cache,
+                 cache_key=(name, cls), shared=self.shared,
+                 lock=self.lock, NOT_FOUND=NOT_FOUND)
+        self.cache_key = d['cache_key']
+        return d
+
+    @override_super
+    def encode_wrapper(self, code):
+        self.encode_get_cache(code)
+        self.encode_lookup(code)
+        self.encode_get_base_result(code)
+        self.encode_do_fn(code)
+        if self.can_override:
+            code.extend((
+                '    if override is type_none:',
+                '        res = None',
+                '    elif override is not None:',
+                '        res = override',
+            ))
+        self.encode_store(code)
+        self.encode_return(code)
+
+    def encode_get_cache(self, code):
+        if self.per_class:
+            code.append('    _cache = shared')
+        else:
+            code.extend((
+                '    try:',
+                '        _cache = _self.__dict__[cache_key]',
+                '    except (KeyError, AttributeError):',
+                '        _cache = new_cache(_self)',
+            ))
+        code.append('    _results = _cache.results')
+
+    def encode_locked(self, code, lines):
+        # Only the shared cache can be used by several threads at once.
+        if self.per_class:
+            code.append('    with lock:')
+            code.extend('    ' + line for line in lines)
+        else:
+            code.extend(lines)
+
+    def encode_lookup(self, code):
+        args = self.get_call_args()
+        if self.key is not None:
+            code.append('    _key = memo_key(%s)' % ', '.join(args))
+        elif self.argnames is None:
+            code.extend((
+                '    if _kw:',
+                '        _key = _args, frozenset(_kw.iteritems())',
+                '    else:',
+                '        _key = _args',
+            ))
+        else:
+            code.append('    _key = (%s)' % ''.join(a + ', ' for a in args))
+        lines = ['    _entry = _results.pop(_key, NOT_FOUND)']
+        if self.ttl is None:
+            lines.append('    if _entry is not NOT_FOUND:')
+        else:
+            lines.append('    if _entry is not NOT_FOUND and '
+                         '_entry[1] > clock():')
+        lines.extend((
+            '        _cache.hits += 1',
+            '        _results[_key] = _entry',
+            '        return _entry%s' % ('' if self.ttl is None else '[0]'),
+            '    _cache.misses += 1',
+        ))
+        self.encode_locked(code, lines)
+
+    def encode_store(self, code):
+        if self.ttl is None:
+            lines = ['    _results[_key] = res']
+        else:
+            lines = ['    _results[_key] = (res, clock() + ttl)']
+        if self.maxsize is not None:
+            lines.extend((
+                '    if len(_results) > maxsize:',
+                '        _results.popitem(last=False)',
+            ))
+        self.encode_locked(code, lines)
+
+    def new_cache(self, obj):
+        '''
+        Returns the MemoCache of obj, making it if there is none yet.
+        Objects without a __dict__ have theirs kept by id in instances
+        until they are collected.
+        '''
+
+        with self.lock:
+            d = getattr(obj, '__dict__', None)
+            if d is not None:
+                cache = d.get(self.cache_key)
+                if cache is None:
+                    cache = d[self.cache_key] = MemoCache(self.maxsize)
+                return cache
+            key = id(obj)
+            entry = self.instances.get(key)
+            if entry is None:
+                ref = weakref.ref(obj, lambda ref: self.forget(key))
+                entry = self.instances[key] = ref, MemoCache(self.maxsize)
+            return entry[1]
+
+    def forget(self, key):
+        with self.lock:
+            self.instances.pop(key, None)
+
+    def cache_for(self, obj=None):
+        '''
+        Returns the MemoCache holding results for obj (or the shared one
+        if per_class), or None if there is none yet.
+        '''
+
+        if self.per_class:
+            return self.shared
+        d = getattr(obj, '__dict__', None)
+        if d is not None:
+            return d.get(self.cache_key)
+        entry = self.instances.get(id(obj))
+        return None if entry is None else entry[1]
+
+    @filter_super
+    def build_wrapper(self, wrapper, cls, name):
+        wrapper.cache_for = self.cache_for
+        return wrapper
+memoize_super = MemoizeSuperMethodBuilder
+
+def get_layers(cls, name, UNBOUND_TYPES=UNBOUND_TYPES):
+    '''
+    Returns the generated wrappers that calling name on an instance of cls
+    passes through, most derived first, along with the implementation
+    below them.  Returns None if any layer cannot be flattened.
+    '''
+
+    mro = cls.__mro__
+    layers = []
+    attr = find_attr(name, mro)
+    while type(attr) is types.FunctionType and hasattr(attr, '__builder__'):
+        if not attr.__builder__.can_flatten():
+            break
+        layers.append(attr)
+        attr = find_attr(name, mro, mro.index(attr.__bwclass__) + 1)
+    if layers and (attr is None or isinstance(attr, UNBOUND_TYPES)) and \
+       not unwatched(name, mro, mro.index(layers[-1].__bwclass__) + 1):
+        argnames = set(layer.__builder__.argnames for layer in layers)
+        if len(argnames) == 1:
+            return tuple(layers), attr
+    return None
+
+def flatten(cls, name, NOT_FOUND=NOT_FOUND):
+    '''
+    Methods modified by generated wrappers at several levels of a class
+    hierarchy have each call pass through every wrapper.  To avoid that,
+    BWObject classes get a single function per such method that calls
+    each level's function in order (where all of the levels are before,
+    after, follow or filter_super wrappers with the same arguments):
+
+    >>> class Base(BWObject):
+    ...     def handle(self, x):
+    ...         return [x]
+    ...
+    >>> class Logged(Base):
+    ...     @before_super
+    ...     def handle(self, x):
+    ...         if x < 0:
+    ...             return override_result(None)
+    ...
+    >>> class Doubled(Logged):
+    ...     @filter_super
+    ...     def handle(self, res, x):
+    ...         if res is not None:
+    ...             return res * 2
+    ...
+    >>> class Counted(Doubled):
+    ...     count = 0
+    ...     @after_super
+    ...     def handle(self, x):
+    ...         self.count += 1
+    ...
+    >>> print Counted.handle.__src__
+    def handle(_self, x):
+        override = fn_2(_self, x)
+        if override is type_none:
+            res = None
+        elif override is not None:
+            res = override
+        else:
+            res = base(_self, x)
+        override = fn_1(_self, res, x)
+        if override is type_none:
+            res = None
+        elif override is not None:
+            res = override
+        fn_0(_self, x)
+        return res
+    >>> c = Counted()
+    >>> c.handle(1), c.handle(-1), c.count
+    ([1, 1], None, 2)
+
+    The flattened function is rebuilt when a level changes:
+
+    >>> Doubled.handle = lambda self, x: ['replaced']
+    >>> c.handle(1)
+    ['replaced']
+    >>> del Doubled.handle
+    >>> c.handle(1)
+    [1]
+
+    Subclasses whose MRO puts other classes between the levels call those
+    as the unflattened wrappers would:
+
+    >>> class Wrapped(Logged):
+    ...     @around_super
+    ...     def handle(self, super_fn, x):
+    ...         return ('around', super_fn(x))
+    ...
+    >>> class Mixed(Logged):
+    ...     def handle(self, x):
+    ...         return 'mixed'
+    ...
+    >>> class Diamond(Counted, Wrapped):
+    ...     pass
+    ...
+    >>> class Other(Counted, Mixed):
+    ...     pass
+    ...
+    >>> Diamond().handle(1), Other().handle(1), Counted().handle(1)
+    (('around', [1]), 'mixed', [1])
+    '''
+
+    current = cls.__dict__.get(name, NOT_FOUND)
+    original = getattr(current, '__bwflat__', current)
+    found = get_layers(cls, name)
+    if found is not None and len(found[0]) < 2:
+        found = None
+    inherited = NOT_FOUND
+    for base in cls.__mro__[1:]:
+        inherited = base.__dict__.get(name, NOT_FOUND)
+        if inherited is not NOT_FOUND:
+            break
+    if found is not None:
+        if getattr(current, '__bwlayers__', None) == found:
+            return
+        if (original is NOT_FOUND and
+            getattr(inherited, '__bwlayers__', None) == found):
+            desired = NOT_FOUND
+        else:
+            desired = build_flat(name, *found)
+            desired.__bwflat__ = original
+            desired.__bwlayers__ = found
+    elif original is not NOT_FOUND:
+        desired = original
+    else:
+        # An inherited flattened function does not apply when the MRO of
+        # cls puts another class between (or before) its layers, so cls
+        # gets a function passing through to the definition it should see.
+        target = find_attr(name, cls.__mro__)
+        if (target is None or not hasattr(inherited, '__bwflat__') or
+            getattr(inherited, '__bwtarget__', None) is target):
+            desired = NOT_FOUND
+        elif getattr(current, '__bwtarget__', None) is target:
+            return
+        else:
+            desired = build_passthrough(name, target)
+    if desired is NOT_FOUND:
+        if current is not NOT_FOUND:
+            type.__delattr__(cls, name)
+    elif desired is not current:
+        type.__setattr__(cls, name, desired)
+
+def build_passthrough(name, target, FunctionType=types.FunctionType):
+    '''
+    Returns a function for a class that would otherwise inherit a flattened
+    function not applying to it, behaving as target (the definition its
+    instances should see) does.
+    '''
+
+    if type(target) is FunctionType:
+        fn = FunctionType(target.func_code, target.func_globals, name,
+                          target.func_defaults, target.func_closure)
+        fn.__dict__.update(target.__dict__)
+        fn.__doc__ = target.__doc__
+    else:
+        def fn(_self, *_args, **_kw):
+            return target.__get__(_self, type(_self))(*_args, **_kw)
+        fn.__name__ = name
+    fn.__bwflat__ = NOT_FOUND
+    fn.__bwtarget__ = target
+    fn.__bwlayers__ = None
+    return fn
+
+def build_flat(name, layers, base):
+    top = layers[0].__builder__
+    if base is not None and top.argnames is not None:
+        base = adapt_call(base, top.argnames, top.argdefaults)
+    v = dict(base=base, type_none=type(None))
+    params = top.argnames
+    if params is None:
+        code = ['def %s(_self, *_args, **_kw):' % name]
+    else:
+        defaults = layers[0].func_defaults or ()
+        params = list(params)
+        offset = len(params) - len(defaults)
+        for i, default in enumerate(defaults):
+            key = '_default_%d' % i
+            v[key] = default
+            params[offset + i] += '=' + key
+        code = ['def %s(%s):' % (name, ', '.join(['_self'] + params))]
+    def encode(code, indent, i=0):
+        if i == len(layers):
+            if base is None:
+                code.append(indent + 'res = None')
+            else:
+                code.append(indent + 'res = base(%s)' %
+                            ', '.join(('_self',) + top.get_call_args()))
+        else:
+            builder = layers[i].__builder__
+            v['fn_%d' % i] = builder.fn
+            builder.encode_flat(code, indent, 'fn_%d' % i,
+                                lambda code, indent: encode(code, indent, i + 1))
+    encode(code, '    ')
+    code.append('    return res')
+    src = '\n'.join(code)
+    exec src in v
+    flat = v.pop(name)
+    flat.__src__ = src
+    flat.__doc__ = layers[0].__doc__
+    return flat
+
+def flatten_class(cls):
+    # Only names whose first definition in the MRO is a wrapper or a
+    # flattened function can have layers to flatten in cls.
+    seen = set()
+    for base in cls.__mro__:
+        for name in FLAT_NAMES.intersection(base.__dict__):
+            if name not in seen:
+                seen.add(name)
+                attr = base.__dict__[name]
+                if (hasattr(attr, '__builder__') or
+                    hasattr(attr, '__bwflat__')):
+                    flatten(cls, name)
+CLASS_WATCHERS.append(flatten_class)
+
+def reflatten(changed, name):
+    if name in FLAT_NAMES:
+        classes = [changed]
+        while classes:
+            cls = classes.pop()
+            flatten(cls, name)
+            classes.extend(type.__subclasses__(cls))
+ATTRIBUTE_WATCHERS.append(reflatten)
+
+def find_method(cls, name, FunctionType=types.FunctionType,
+                NOT_FOUND=NOT_FOUND):
+    '''
+    Returns the plain function that name resolves to on instances of cls
+    (for any instance not shadowing it in its __dict__), or None if it is
+    not a plain function.
+    '''
+
+    for base in cls.__mro__:
+        attr = base.__dict__.get(name, NOT_FOUND)
+        if attr is not NOT_FOUND:
+            return attr if type(attr) is FunctionType else None
+    return None
+
+def invoke_all(objs, name, args=(), kw=None, pool=None, chunksize=1024):
+    '''
+    Calls method name with args and kw on each of objs, returning the
+    results in the order of objs.  Objects are grouped by class and each
+    class's method (with all its wrappers, see flatten) is looked up once,
+    so objects are called class by class rather than in order:
+
+    >>> class Base(BWObject):
+    ...     def scale(self, x):
+    ...         return x
+    ...
+    >>> class Doubled(Base):
+    ...     @filter_super
+    ...     def scale(self, res, x):
+    ...         return res * 2
+    ...
+    >>> class Odd(Base):
+    ...     scale = staticmethod(lambda x: -x)
+    ...
+    >>> objs = [Base(), Doubled(), Odd(), Doubled()]
+    >>> invoke_all(objs, 'scale', (3,))
+    [3, 6, -3, 6]
+
+    Given a pool (anything with a map(fn, iterable, chunksize) method,
+    such as multiprocessing's Pool and ThreadPool), objs are split into
+    chunks of chunksize which are called in the pool.  Process pools work
+    on copies of objs, so changes the methods make to them are lost.
+
+    >>> from multiprocessing.pool import ThreadPool
+    >>> pool = ThreadPool(2)
+    >>> invoke_all(objs * 3, 'scale', kw={'x': 1}, pool=pool, chunksize=5)
+    [1, 2, -1, 2, 1, 2, -1, 2, 1, 2, -1, 2]
+    >>> pool.close()
+    '''
+
+    if kw is None:
+        kw = {}
+    if pool is not None:
+        chunks = [(objs[i:i + chunksize], name, args, kw)
+                  for i in xrange(0, len(objs), chunksize)]
+        results = []
+        for chunk in pool.map(invoke_chunk, chunks, 1):
+            results.extend(chunk)
+        return results
+    groups = {}
+    for i, obj in enumerate(objs):
+        cls = type(obj)
+        indices = groups.get(cls)
+        if indices is None:
+            indices = groups[cls] = []
+        indices.append(i)
+    results = [None] * len(objs)
+    for cls, indices in groups.iteritems():
+        fn = find_method(cls, name)
+        if fn is None:
+            for i in indices:
+                results[i] = getattr(objs[i], name)(*args, **kw)
+        elif cls.__dictoffset__:
+            for i in indices:
+                obj = objs[i]
+                if name in obj.__dict__:
+                    results[i] = getattr(obj, name)(*args, **kw)
+                else:
+                    results[i] = fn(obj, *args, **kw)
+        else:
+            for i in indices:
+                results[i] = fn(objs[i], *args, **kw)
+    return results
+
+def invoke_chunk(chunk):
+    return invoke_all(*chunk)
+
 def override_result(v, type_none=type(None)):
     '''
     Methods that return overrides cannot simply return None since that is
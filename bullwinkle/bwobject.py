@@ -8,6 +8,13 @@ metaclass that make most of the other features possible.
 from __version__ import *
 import sys
 
+# Functions called with (cls, name) whenever an attribute of a BWObject
+# class is assigned or deleted after the class is created.
+ATTRIBUTE_WATCHERS = []
+
+# Functions called with each BWObject class once it has been bound.
+CLASS_WATCHERS = []
+
 class BWObjectMeta(type):
     '''
     Provides the machinery for making Object work.  It scans any derived
@@ -15,10 +22,35 @@ class BWObjectMeta(type):
     class and attribute name as parameters.  If the function returns
     anything but None, that is used to replace the called function.
 
+    Classes that declare __slots__ and get no __dict__ from their bases
+    also have each member's __bindslots__ method (if any) called with the
+    attribute name; the slot names it returns are added to __slots__
+    before the class is created.
+
+    Assigning or deleting class attributes calls the functions in
+    ATTRIBUTE_WATCHERS with the class and attribute name, which lets
+    caches derived from class attributes be invalidated.  Once a class
+    has been bound, the functions in CLASS_WATCHERS are called with it.
+
     See also:
     Object.makemeta()
     '''
 
+    def __new__(meta, typename, typebases, typedict):
+        slots = typedict.get('__slots__')
+        if slots is not None and not any(getattr(base, '__dictoffset__', 1)
+                                         for base in typebases):
+            if isinstance(slots, basestring):
+                slots = (slots,)
+            slots = list(slots)
+            for name, value in typedict.items():
+                fn = getattr(value, '__bindslots__', None)
+                if fn is not None:
+                    slots.extend(s for s in fn(name) if s not in slots)
+            typedict['__slots__'] = tuple(slots)
+        return super(BWObjectMeta, meta).__new__(meta, typename,
+                                                 typebases, typedict)
+
     def __init__(cls, typename, typebases, typedict):
         super(BWObjectMeta, cls).__init__(typename, typebases, typedict)
         for name, value in typedict.iteritems():
@@ -30,6 +62,18 @@ class BWObjectMeta(type):
                         delattr(cls, name)
                     else:
                         setattr(cls, name, replacement)
+        for fn in CLASS_WATCHERS:
+            fn(cls)
+
+    def __setattr__(cls, name, value):
+        super(BWObjectMeta, cls).__setattr__(name, value)
+        for fn in ATTRIBUTE_WATCHERS:
+            fn(cls, name)
+
+    def __delattr__(cls, name):
+        super(BWObjectMeta, cls).__delattr__(name)
+        for fn in ATTRIBUTE_WATCHERS:
+            fn(cls, name)
 
 class BWObject(object):
     '''
@@ -157,6 +201,21 @@ class BWObject(object):
     <1, 2>
     >>> print Point(1, 2)
     Point(x=1, y=2)
+
+    Instances keep an ordinary __dict__, so they accept any attribute,
+    support weak references and pickle with every protocol:
+
+    >>> import pickle, sys
+    >>> class Stamp(BWObject):
+    ...     __positional__ = ('label',)
+    ...
+    ...     def __initkw__(self, name, value):
+    ...         setattr(self, name, value)
+    ...
+    >>> setattr(sys.modules[__name__], 'Stamp', Stamp) # Found by pickle.
+    >>> stamp = pickle.loads(pickle.dumps(Stamp('draft'), 0))
+    >>> type(stamp) is Stamp, stamp.label
+    (True, 'draft')
     '''
 
     __metaclass__ = BWObjectMeta
@@ -101,14 +101,64 @@ The default BWThrowable will simply return None if not found:
 
 >>> print BWThrowable.catch()
 None
+
+============================
+=== Thread-local indexes ===
+============================
+
+Catching looks up the locals of each frame on the stack, which costs
+time proportional to the stack's depth.  Classes setting use_stack (or
+all, when set on BWThrowable) instead keep a per-thread index of the
+frames they are thrown to, so catching only compares frame identities
+while walking up, and catching the only object thrown again from the
+same depth checks a single frame.  The objects are still held by the
+frames they are thrown to and leave the index when those frames go
+away, so they are caught exactly as before:
+
+>>> class Request(BWThrowable):
+...     use_stack = True
+...
+>>> def handler():
+...     Request().throw()
+...     return controller()
+...
+>>> def controller():
+...     return Request.catch()
+...
+>>> type(handler()).__name__, controller()
+('Request', None)
+
+Objects thrown in suspended generators or frames kept alive after
+returning are not on the current stack and so are not caught:
+
+>>> def paused():
+...     Request().throw()
+...     yield Request.catch()
+...
+>>> gen = paused()
+>>> type(next(gen)).__name__, controller()
+('Request', None)
+
+Throwing through TC by class uses the index as well:
+
+>>> def tc_handler():
+...     TC[Request] = Request()
+...     return controller()
+...
+>>> type(tc_handler()).__name__
+'Request'
 '''
 
 from __version__ import *
 from bwobject import BWObject
-import sys
+import sys, threading
 
 def throw(key, value, frame=0):
-    sys._getframe(frame + 1).f_locals[key] = value
+    f = sys._getframe(frame + 1)
+    if isinstance(key, type) and getattr(key, 'use_stack', False):
+        throw_indexed(f, key, value)
+    else:
+        f.f_locals[key] = value
     return value
 
 def catch(key, default=None, NOT_FOUND=KeyError):
@@ -125,16 +175,99 @@ class BWThrowableNotFoundError(Exception):
     def __init__(self, cls):
         self.cls = cls
 
+class ThrownFrames(threading.local):
+    def __init__(self):
+        self.frames = {}
+THROWN = ThrownFrames()
+
+class ThrowEntry(object):
+    '''
+    Indexes an object by the id of the frame it was thrown to (see
+    BWThrowable.use_stack) for as long as the entry is referenced from
+    that frame's locals.  Frames cannot be weakly referenced and ids are
+    reused, so a frame found by id is only taken to be the one thrown to
+    if the entry is in its locals (see thrown_to).
+    '''
+
+    __slots__ = ('frames', 'key', 'cell')
+
+    def __init__(self, frames, frame, obj):
+        self.frames = frames
+        self.key = id(frame)
+        # The index holds a cell rather than the entry (or the frame),
+        # which would otherwise never be released.  The cell also keeps
+        # how many frames up the object was last caught from.
+        self.cell = [obj, 0]
+        frames[self.key] = self.cell
+
+    def __del__(self):
+        if self.frames.get(self.key) is self.cell:
+            del self.frames[self.key]
+
+def throw_indexed(f, cls, obj):
+    '''
+    Throws obj to frame f as cls through the index of cls.
+    '''
+
+    frames = THROWN.frames.get(cls)
+    if frames is None:
+        frames = THROWN.frames[cls] = {}
+    f.f_locals[ThrowEntry, cls] = ThrowEntry(frames, f, obj)
+
+def thrown_to(f, cls, cell):
+    '''
+    Returns whether the indexed cell of cls was thrown to frame f.
+    '''
+
+    entry = f.f_locals.get((ThrowEntry, cls))
+    return entry is not None and entry.cell is cell
+
 class BWThrowable(BWObject):
+    use_stack = False
+
     def throw(self, frame=0):
-        sys._getframe(frame + 1).f_locals[type(self)] = self
+        f = sys._getframe(frame + 1)
+        cls = type(self)
+        if cls.use_stack:
+            throw_indexed(f, cls, self)
+        else:
+            f.f_locals[cls] = self
         return self
     __enter__ = throw
 
     @classmethod
     def catch(cls):
-        top = sys._getframe(1)
+        top = None
         for base in cls.__mro__:
+            if getattr(base, 'use_stack', False):
+                frames = THROWN.frames.get(base)
+                if not frames:
+                    continue
+                if len(frames) == 1:
+                    # With a single entry, catching from the same depth
+                    # as last time only needs to check that frame.
+                    (key, cell), = frames.items()
+                    try:
+                        f = sys._getframe(cell[1] + 1)
+                    except ValueError:
+                        pass
+                    else:
+                        if id(f) == key and thrown_to(f, base, cell):
+                            return cell[0]
+                if top is None:
+                    top = sys._getframe(1)
+                f = top
+                up = 0
+                while f is not None:
+                    cell = frames.get(id(f))
+                    if cell is not None and thrown_to(f, base, cell):
+                        cell[1] = up
+                        return cell[0]
+                    f = f.f_back
+                    up += 1
+                continue
+            if top is None:
+                top = sys._getframe(1)
             f = top
             while f is not None:
                 obj = f.f_locals.get(base)